@@ -0,0 +1,63 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+# Asset registry: every image, sound effect and music track the game uses is
+# loaded once and kept here by name. preload() hands the loading to a pool of
+# worker threads, and pygame lets go of the GIL while it decodes files, so the
+# loads overlap and starting up takes about as long as the slowest asset
+# rather than all of them one after another.
+
+MAX_WORKERS = 8
+
+
+def read_file(path):
+    # Raw file contents, e.g. music to stream from memory with io.BytesIO
+    with open(path, "rb") as f:
+        return f.read()
+
+
+class AssetRegistry:
+    def __init__(self):
+        self.assets = {}   # name -> loaded asset
+        self.pending = {}  # name -> Future of an asset still loading
+        self.executor = None
+
+    def preload(self, loaders):
+        # Start loading {name: function returning the asset} on the worker threads
+        if self.executor is None:
+            workers = min(MAX_WORKERS, (os.cpu_count() or 1) + 4)  # Loading waits on the disk as much as the CPU
+            self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="asset-loader")
+        for name, load in loaders.items():
+            if name not in self.assets and name not in self.pending:
+                self.pending[name] = self.executor.submit(load)
+
+    def collect(self):
+        # Move finished loads into the registry
+        for name, future in list(self.pending.items()):
+            if future.done():
+                self.assets[name] = self.pending.pop(name).result()
+
+    def progress(self):
+        # (assets loaded, assets requested)
+        self.collect()
+        return len(self.assets), len(self.assets) + len(self.pending)
+
+    def ready(self):
+        self.collect()
+        return not self.pending
+
+    def get(self, name, load=None):
+        # The asset called name: waits for it if it is still loading, and
+        # loads it right here with load() if it was never preloaded
+        if name in self.pending:
+            self.assets[name] = self.pending.pop(name).result()
+        if name not in self.assets:
+            if load is None:
+                raise KeyError(name)
+            self.assets[name] = load()
+        return self.assets[name]
+
+    def shutdown(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
@@ -0,0 +1,96 @@
+import json
+import logging
+import platform
+
+import pygame
+
+# Frame-time statistics for the scenario benchmarks (python square.py --benchmark).
+# All times are in milliseconds.
+
+PHASES = ["update", "render", "total"]
+
+log = logging.getLogger(__name__)
+
+
+def percentile(sorted_values, p):
+    # Linear interpolation between the closest ranks, p in [0, 100]
+    if not sorted_values:
+        return 0.0
+    k = (len(sorted_values) - 1) * p / 100
+    low = int(k)
+    high = min(low + 1, len(sorted_values) - 1)
+    return sorted_values[low] + (sorted_values[high] - sorted_values[low]) * (k - low)
+
+
+def summarize(values):
+    ordered = sorted(values)
+    return {
+        "mean": sum(ordered) / len(ordered) if ordered else 0.0,
+        "p50": percentile(ordered, 50),
+        "p95": percentile(ordered, 95),
+        "p99": percentile(ordered, 99),
+        "max": ordered[-1] if ordered else 0.0,
+    }
+
+
+class FrameTimes:
+    # Per-frame update and render times of one scenario
+    def __init__(self):
+        self.samples = {phase: [] for phase in PHASES}
+
+    def add(self, update_ms, render_ms):
+        self.samples["update"].append(update_ms)
+        self.samples["render"].append(render_ms)
+        self.samples["total"].append(update_ms + render_ms)
+
+    def summary(self):
+        result = {"frames": len(self.samples["total"])}
+        for phase in PHASES:
+            result[phase] = {key: round(value, 4) for key, value in summarize(self.samples[phase]).items()}
+        return result
+
+
+def build_report(results, frames, warmup, render_mode, surface_format):
+    return {
+        "frames_per_scenario": frames,
+        "warmup_frames": warmup,
+        "render_mode": render_mode,
+        "surface_format": surface_format,
+        "unit": "ms",
+        "python": platform.python_version(),
+        "pygame": pygame.version.ver,
+        "platform": platform.platform(),
+        "video_driver": pygame.display.get_driver() if pygame.display.get_init() else None,
+        "scenarios": results,
+    }
+
+
+def write_report(report, path):
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2)
+        f.write("\n")
+    log.info("Benchmark report written to %s", path)
+
+
+def compare(base, other, phase="render"):
+    # Mean and p95 of phase per scenario in two reports, and how much other saves
+    rows = []
+    for name, result in base["scenarios"].items():
+        if name in other["scenarios"]:
+            before, after = result[phase], other["scenarios"][name][phase]
+            rows.append((name, before["mean"], after["mean"], before["p95"], after["p95"]))
+    return rows
+
+
+if __name__ == "__main__":
+    # python benchmark.py BASE.json OTHER.json [PHASE]: compare two benchmark reports
+    import sys
+    with open(sys.argv[1]) as f:
+        base = json.load(f)
+    with open(sys.argv[2]) as f:
+        other = json.load(f)
+    phase = sys.argv[3] if len(sys.argv) > 3 else "render"
+    print(f"{phase} ms       {'mean':>17} {'p95':>17}")
+    for name, mean_before, mean_after, p95_before, p95_after in compare(base, other, phase):
+        print(f"{name:<18} {mean_before:7.3f} -> {mean_after:7.3f} {p95_before:7.3f} -> {p95_after:7.3f}"
+              f"  ({(mean_before - mean_after) / mean_before * 100 if mean_before else 0:+.1f}%)")
@@ -0,0 +1,69 @@
+from collections import deque
+
+import pygame
+
+import surfaces
+
+# Pre-rendered overlays for the player effects (sprint trail and glow, dash
+# outline, the clear_enemies splash) and the small see-through shapes of the
+# menus. Each distinct look is drawn once, the first time it is needed, and
+# the same display-format surface is blitted from then on, so effects add no
+# surface allocations or pixel format conversions to a frame.
+
+TRAIL_LENGTH = 10  # Player positions kept for the sprint trail
+
+baked_surfaces = {}  # Baked overlays by what they look like
+
+
+def baked(key, draw):
+    # The surface for key, made by draw() the first time it is asked for
+    surface = baked_surfaces.get(key)
+    if surface is None:
+        surface = baked_surfaces[key] = draw()
+    return surface
+
+
+def new_trail():
+    # Ring buffer of recent positions, the oldest falls out as a new one comes in
+    return deque(maxlen=TRAIL_LENGTH)
+
+
+def tint(size, color):
+    # A size rect filled with an RGBA color. The alpha is the same everywhere,
+    # so it is the surface's alpha instead of one per pixel, which blends faster.
+    def draw():
+        surface = surfaces.new(size)
+        surface.fill(color[:3])
+        surface.set_alpha(color[3])
+        return surface
+    return baked(("tint", size, color), draw)
+
+
+def glow(size, color, spread, border_radius):
+    # A rounded size rect with spread // 2 transparent pixels around it
+    def draw():
+        width, height = size
+        surface = pygame.Surface((width + spread, height + spread), pygame.SRCALPHA)
+        pygame.draw.rect(surface, color, (spread // 2, spread // 2, width, height), border_radius=border_radius)
+        return surfaces.prepare(surface, rle=True)
+    return baked(("glow", size, color, spread, border_radius), draw)
+
+
+def outline(size, color, thickness):
+    # A thickness-wide frame around a size rect, centered on its edge
+    def draw():
+        width, height = size
+        surface = pygame.Surface((width + thickness * 2, height + thickness * 2), pygame.SRCALPHA)
+        pygame.draw.rect(surface, color, (thickness // 2, thickness // 2, width + thickness, height + thickness), thickness)
+        return surfaces.prepare(surface, rle=True)
+    return baked(("outline", size, color, thickness), draw)
+
+
+def card(size, color, border_color, border_radius, border_width=2):
+    # A rounded size rect with a border_width-wide border
+    def draw():
+        surface = pygame.Surface(size, pygame.SRCALPHA)
+        pygame.draw.rect(surface, color, surface.get_rect(), border_radius=border_radius)
+        pygame.draw.rect(surface, border_color, surface.get_rect(), width=border_width, border_radius=border_radius)
+        return surfaces.prepare(surface, rle=True)
+    return baked(("card", size, color, border_color, border_radius, border_width), draw)
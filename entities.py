@@ -0,0 +1,148 @@
+import numpy as np
+import pygame
+
+# Entity storage for the simulation: one NumPy array per field instead of one
+# object per entity, so moving, culling and hit-testing a whole group is a few
+# array operations no matter how many entities it holds.
+
+
+class EntityStore:
+    # Entity i is (x[i], y[i], w[i], h[i]) moving by (vx[i], vy[i]) per step
+    # (or, for groups moved some other way, the distance it moved last step),
+    # with a flag (e.g. piercing) and a kind (e.g. power-up type) for i < count.
+    # The arrays grow by doubling, the order of entities is kept.
+    FIELDS = ("x", "y", "w", "h", "vx", "vy", "flag", "kind")
+
+    def __init__(self, capacity=64):
+        self.count = 0
+        for name in self.FIELDS:
+            setattr(self, name, np.zeros(capacity, dtype=np.int32))
+
+    def __len__(self):
+        return self.count
+
+    def column(self, name):
+        # Live view of one field
+        return getattr(self, name)[:self.count]
+
+    def add(self, x, y, w, h, vx=0, vy=0, flag=0, kind=0):
+        if self.count == len(self.x):
+            self.make_room()
+        i = self.count
+        self.x[i], self.y[i], self.w[i], self.h[i] = x, y, w, h
+        self.vx[i], self.vy[i], self.flag[i], self.kind[i] = vx, vy, flag, kind
+        self.count += 1
+
+    def make_room(self):
+        for name in self.FIELDS:
+            old = getattr(self, name)
+            new = np.zeros(len(old) * 2, dtype=old.dtype)
+            new[:self.count] = old[:self.count]
+            setattr(self, name, new)
+
+    def clear(self):
+        self.count = 0
+
+    def move(self):
+        n = self.count
+        self.x[:n] += self.vx[:n]
+        self.y[:n] += self.vy[:n]
+
+    def keep(self, mask):
+        # Drop every entity whose mask entry is False
+        n = self.count
+        kept = np.flatnonzero(mask)
+        if len(kept) == n:
+            return
+        for name in self.FIELDS:
+            column = getattr(self, name)
+            column[:len(kept)] = column[:n][kept]
+        self.count = len(kept)
+
+    def remove(self, indices):
+        if len(indices):
+            mask = np.ones(self.count, dtype=bool)
+            mask[indices] = False
+            self.keep(mask)
+
+    def keep_last(self, limit):
+        # Cap the group, dropping the oldest entities
+        n = self.count
+        if n > limit:
+            for name in self.FIELDS:
+                column = getattr(self, name)
+                column[:limit] = column[n - limit:n]
+            self.count = limit
+
+    def overlapping(self, rect):
+        # Indices of the entities overlapping rect, in order (same test as Rect.colliderect)
+        n = self.count
+        x, y = self.x[:n], self.y[:n]
+        hit = (x < rect.right) & (x + self.w[:n] > rect.left) & (y < rect.bottom) & (y + self.h[:n] > rect.top)
+        return np.flatnonzero(hit)
+
+    def pairs(self, other):
+        # All overlapping (i, j) with i an entity of other and j one of this
+        # store, sorted by i then j. Tests every pair at once, which at the
+        # game's caps (a few dozen entities a side) beats sorting them into cells.
+        n, m = self.count, other.count
+        ox, oy = other.x[:m, None], other.y[:m, None]
+        x, y = self.x[None, :n], self.y[None, :n]
+        hit = ((x < ox + other.w[:m, None]) & (x + self.w[None, :n] > ox) &
+               (y < oy + other.h[:m, None]) & (y + self.h[None, :n] > oy))
+        return np.nonzero(hit)
+
+    def rect(self, i):
+        return pygame.Rect(int(self.x[i]), int(self.y[i]), int(self.w[i]), int(self.h[i]))
+
+    def rects(self, back=0):
+        # pygame Rects for drawing, `back` steps (0..1) behind the current positions
+        n = self.count
+        x, y = self.x[:n], self.y[:n]
+        if back:
+            x = np.rint(x - self.vx[:n] * back).astype(np.int32)
+            y = np.rint(y - self.vy[:n] * back).astype(np.int32)
+        return [pygame.Rect(r) for r in zip(x.tolist(), y.tolist(), self.w[:n].tolist(), self.h[:n].tolist())]
+
+
+class ProjectilePool(EntityStore):
+    # EntityStore for bullets: many are fired and many leave the screen every
+    # second, and the order they are kept in doesn't matter. The arrays are
+    # allocated once. Removal moves the last projectiles into the gaps instead
+    # of shifting everything behind them, and a full pool drops its oldest
+    # projectile to make room for a new one.
+    FIELDS = EntityStore.FIELDS + ("serial",)  # serial: the number of the shot, for finding the oldest
+
+    def __init__(self, capacity=256):
+        super().__init__(capacity)
+        self.fired = 0
+
+    def add(self, x, y, w, h, vx=0, vy=0, flag=0, kind=0):
+        super().add(x, y, w, h, vx, vy, flag, kind)
+        self.serial[self.count - 1] = self.fired
+        self.fired += 1
+
+    def make_room(self):
+        self.remove([np.argmin(self.column("serial"))])
+
+    def keep(self, mask):
+        n = self.count
+        dead = np.flatnonzero(~mask)
+        if not len(dead):
+            return
+        # Survivors past the new end fill the gaps before it
+        end = n - len(dead)
+        gaps = dead[dead < end]
+        if len(gaps):
+            movers = np.flatnonzero(mask[end:]) + end
+            for name in self.FIELDS:
+                column = getattr(self, name)
+                column[gaps] = column[movers]
+        self.count = end
+
+    def keep_last(self, limit):
+        # Cap the pool, dropping the oldest projectiles
+        n = self.count
+        if n > limit:
+            self.remove(np.argpartition(self.column("serial"), n - limit - 1)[:n - limit])
+
@@ -0,0 +1,68 @@
+import logging
+import logging.handlers
+import queue
+import sys
+
+# Leveled logging for the game. Code logs through logging.getLogger(__name__)
+# with %-style arguments, so a message below the level is dropped before its
+# text is ever formatted. Records that pass go into a queue and a listener
+# thread writes them out, so a slow console (stdout on a serial line) never
+# holds up a frame. A debug or info message logged over and over, e.g. once
+# per frame, is only let through once per RATE_LIMIT_INTERVAL seconds.
+# Warnings and errors always get through: two of them with the same text
+# (a missing sound, then another) are different problems.
+
+LOG_LEVELS = ["DEBUG", "INFO", "WARNING", "ERROR"]
+RATE_LIMIT_INTERVAL = 1.0  # Seconds before the same message is logged again
+LOG_FORMAT = "%(relativeCreated)8.0f ms %(levelname)-7s %(name)s: %(message)s"
+
+listener = None  # logging.handlers.QueueListener writing the records, started by setup()
+
+
+class RateLimit(logging.Filter):
+    # Lets each message (logger and unformatted text) below max_level through
+    # at most once per interval seconds, and says how many were held back in between
+    def __init__(self, interval=RATE_LIMIT_INTERVAL, max_level=logging.WARNING):
+        super().__init__()
+        self.interval = interval
+        self.max_level = max_level
+        self.last = {}        # (logger, message) -> time it was last let through
+        self.suppressed = {}  # (logger, message) -> records dropped since then
+
+    def filter(self, record):
+        if record.levelno >= self.max_level:
+            return True
+        key = (record.name, record.msg)
+        last = self.last.get(key)
+        if last is not None and record.created - last < self.interval:
+            self.suppressed[key] = self.suppressed.get(key, 0) + 1
+            return False
+        self.last[key] = record.created
+        dropped = self.suppressed.pop(key, 0)
+        if dropped:
+            record.msg = f"{record.msg} ({dropped} more not shown)"
+        return True
+
+
+def setup(level="INFO", stream=None):
+    # Send the root logger's records through a queue to stream (stderr by default)
+    global listener
+    shutdown()
+    records = queue.SimpleQueue()
+    handler = logging.handlers.QueueHandler(records)
+    handler.addFilter(RateLimit())
+    output = logging.StreamHandler(stream or sys.stderr)
+    output.setFormatter(logging.Formatter(LOG_FORMAT))
+    root = logging.getLogger()
+    root.handlers[:] = [handler]
+    root.setLevel(level)
+    listener = logging.handlers.QueueListener(records, output)
+    listener.start()
+
+
+def shutdown():
+    # Write out whatever is still queued and stop the listener thread
+    global listener
+    if listener is not None:
+        listener.stop()
+        listener = None
@@ -0,0 +1,91 @@
+import numpy as np
+
+import surfaces
+
+# Particle pools for destruction effects. A ParticleSystem keeps every live
+# particle in NumPy arrays: a burst adds a whole block of them, one update
+# moves and expires them all, and drawing is a single blits call of one
+# pre-rendered square.
+
+MAX_PARTICLES = 2000  # Default budget per system, the oldest particles make room for new ones
+PIECE_SIZE = 10
+PIECE_SPEED = 5  # Pieces fly off at -5..5 pixels per step on each axis
+
+
+class ParticleSystem:
+    def __init__(self, color, size=PIECE_SIZE, budget=MAX_PARTICLES, seed=None):
+        self.color = color
+        self.size = size
+        self.budget = budget
+        self.rng = np.random.default_rng(seed)
+        self.count = 0
+        self.x = np.zeros(budget, dtype=np.int32)
+        self.y = np.zeros(budget, dtype=np.int32)
+        self.vx = np.zeros(budget, dtype=np.int32)
+        self.vy = np.zeros(budget, dtype=np.int32)
+        self.expires = np.zeros(budget, dtype=np.float64)  # Game time the particle disappears
+        self.sprite = None  # Rendered on the first draw, so headless runs never need it
+
+    def __len__(self):
+        return self.count
+
+    def clear(self):
+        self.count = 0
+
+    def burst(self, x, y, w, h, now, lifetime):
+        # Break rects (scalars or arrays of x, y, w, h) into size x size pieces
+        # flying apart at random speeds
+        size = self.size
+        xs, ys = [], []
+        for rx, ry, rw, rh in zip(*(np.atleast_1d(v).tolist() for v in (x, y, w, h))):
+            i, j = np.mgrid[0:rw // size, 0:rh // size]
+            xs.append(rx + i.ravel() * size)
+            ys.append(ry + j.ravel() * size)
+        if not xs:
+            return
+        xs, ys = np.concatenate(xs), np.concatenate(ys)
+        n = min(len(xs), self.budget)
+        xs, ys = xs[-n:], ys[-n:]
+        self.make_room(n)
+        end = self.count + n
+        self.x[self.count:end] = xs
+        self.y[self.count:end] = ys
+        self.vx[self.count:end] = self.rng.integers(-PIECE_SPEED, PIECE_SPEED + 1, n)
+        self.vy[self.count:end] = self.rng.integers(-PIECE_SPEED, PIECE_SPEED + 1, n)
+        self.expires[self.count:end] = now + lifetime
+        self.count = end
+
+    def make_room(self, n):
+        # Drop the oldest particles if n more would go over the budget
+        drop = self.count + n - self.budget
+        if drop > 0:
+            keep = self.count - drop
+            for column in (self.x, self.y, self.vx, self.vy, self.expires):
+                column[:keep] = column[drop:self.count]
+            self.count = keep
+
+    def update(self, now):
+        # Expire old particles, then move the rest one step
+        n = self.count
+        alive = np.flatnonzero(self.expires[:n] > now)
+        if len(alive) < n:
+            for column in (self.x, self.y, self.vx, self.vy, self.expires):
+                column[:len(alive)] = column[:n][alive]
+            n = self.count = len(alive)
+        self.x[:n] += self.vx[:n]
+        self.y[:n] += self.vy[:n]
+
+    def draw(self, surface, back=0):
+        # back: how far (0..1 of a step) behind the current positions to draw
+        if not self.count:
+            return
+        if self.sprite is None:
+            self.sprite = surfaces.new((self.size, self.size))
+            self.sprite.fill(self.color)
+        n = self.count
+        x, y = self.x[:n], self.y[:n]
+        if back:
+            x = np.rint(x - self.vx[:n] * back).astype(np.int32)
+            y = np.rint(y - self.vy[:n] * back).astype(np.int32)
+        sprite = self.sprite
+        surface.blits([(sprite, pos) for pos in zip(x.tolist(), y.tolist())], doreturn=False)
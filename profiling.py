@@ -0,0 +1,160 @@
+import cProfile
+import csv
+import os
+import sys
+import threading
+import time
+from collections import Counter, deque
+
+# Per-phase frame profiler. The game loop starts each frame with begin() and
+# calls lap(phase) whenever a phase ends: the time since the previous lap goes
+# to that phase, so a phase that comes up several times in a frame (drawing
+# and HUD take turns) adds up. Simulation code calls the module-level lap(),
+# which does nothing unless a profiler is active, so headless runs and normal
+# play pay for one function call per lap.
+
+PHASES = ["input", "events", "update", "collision", "explosions", "draw", "hud", "overlay", "present"]
+COUNTERS = ["enemies", "bullets", "particles"]
+HISTORY = 240    # Frames kept for the frame-time graph
+SMOOTHING = 0.1  # Weight of the newest frame in the averages shown on screen
+SAMPLE_INTERVAL = 0.001  # Seconds between stack samples
+
+active = None  # The FrameProfiler timing this frame, None when profiling is off
+
+
+def lap(phase):
+    if active is not None:
+        active.lap(phase)
+
+
+class FrameProfiler:
+    def __init__(self, history=HISTORY):
+        self.times = dict.fromkeys(PHASES, 0.0)     # This frame's ms per phase
+        self.averages = dict.fromkeys(PHASES, 0.0)  # Smoothed ms per phase
+        self.counters = dict.fromkeys(COUNTERS, 0)  # Live entities at the end of this frame
+        self.history = deque(maxlen=history)        # Recent frame totals in ms, oldest first
+        self.frame = 0
+        self.last = 0.0
+        self.csv_file = None
+        self.csv_writer = None
+
+    def begin(self):
+        for phase in PHASES:
+            self.times[phase] = 0.0
+        self.last = time.perf_counter()
+
+    def lap(self, phase):
+        now = time.perf_counter()
+        self.times[phase] += (now - self.last) * 1000
+        self.last = now
+
+    def count(self, **counters):
+        self.counters.update(counters)
+
+    def end(self, label=""):
+        # Close the frame: update averages and history, and stream it to the CSV
+        total = sum(self.times.values())
+        for phase, ms in self.times.items():
+            self.averages[phase] += (ms - self.averages[phase]) * SMOOTHING
+        self.history.append(total)
+        self.frame += 1
+        if self.csv_writer is not None:
+            self.csv_writer.writerow([self.frame, label, *(f"{self.times[phase]:.4f}" for phase in PHASES),
+                                      f"{total:.4f}", *(self.counters[name] for name in COUNTERS)])
+
+    @property
+    def average_total(self):
+        return sum(self.averages.values())
+
+    def open_csv(self, path):
+        # One row per profiled frame: frame number, game state, ms per phase, total ms, live entities
+        self.csv_file = open(path, "w", newline="")
+        self.csv_writer = csv.writer(self.csv_file)
+        self.csv_writer.writerow(["frame", "state", *(f"{phase}_ms" for phase in PHASES), "total_ms", *COUNTERS])
+
+    def close(self):
+        if self.csv_file is not None:
+            self.csv_file.close()
+            self.csv_file = self.csv_writer = None
+
+
+# Function-level profiles of a run of frames. A FrameCapture runs cProfile
+# over a fixed number of frames and writes a .pstats file (python -m pstats,
+# snakeviz), and at the same time a StackSampler writes how often each call
+# stack was seen as a .collapsed file for flamegraph tools (flamegraph.pl,
+# speedscope). Both only run between begin_frame() and end_frame(), so the
+# time spent waiting for the next frame is left out.
+
+class StackSampler:
+    # Looks at the call stack of one thread every interval seconds, from a background thread
+    def __init__(self, thread_id, interval=SAMPLE_INTERVAL):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()  # "outer;...;inner" -> samples
+        self.recording = False   # Only sample while this is set
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.run, name="stack-sampler", daemon=True)
+        self.switch_interval = None
+
+    def start(self):
+        # The sampler needs the GIL to look at the other thread. By default
+        # Python hands it over every 5 ms, longer than a whole frame, so the
+        # samples would all land in the calls that let go of it (display
+        # updates, sleeps). Handing it over ten times per interval spreads
+        # them over the frame.
+        self.switch_interval = sys.getswitchinterval()
+        sys.setswitchinterval(self.interval / 10)
+        self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+        self.thread.join()
+        sys.setswitchinterval(self.switch_interval)
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            if not self.recording:
+                continue
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def write_collapsed(self, path):
+        # One "outer;...;inner count" line per stack, the format flamegraph tools read
+        with open(path, "w") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+class FrameCapture:
+    # cProfile and a StackSampler over the next frames frames, written to path + ".pstats" and ".collapsed"
+    def __init__(self, frames, path):
+        self.remaining = frames
+        self.frames = frames
+        self.path = path
+        self.profile = cProfile.Profile()
+        self.sampler = StackSampler(threading.get_ident())
+        self.sampler.start()
+
+    def begin_frame(self):
+        self.sampler.recording = True
+        self.profile.enable()
+
+    def end_frame(self):
+        # Returns True once the last frame is in
+        self.profile.disable()
+        self.sampler.recording = False
+        self.remaining -= 1
+        return self.remaining <= 0
+
+    def finish(self):
+        # Write both files, with the frames recorded so far
+        self.sampler.stop()
+        self.profile.dump_stats(self.path + ".pstats")
+        self.sampler.write_collapsed(self.path + ".collapsed")
+        return self.frames - max(0, self.remaining)
@@ -0,0 +1,156 @@
+import gzip
+import logging
+import struct
+
+import pygame
+
+# Input recordings: the RNG seed and starting time scale plus, for every frame,
+# the frame time, the keys the game reads, the mouse position and the input
+# events. Played back into the same game code, a recording reproduces a session exactly.
+#
+# File layout (gzip compressed, little endian):
+#   header: b"BBRP", version (B), seed (Q), time scale (d, version 2 and later)
+#   frame:  dt ms (H), key bits (B), mouse x, y (hh), state checksum (I), event count (B)
+#   event:  type code (B) followed by its payload, see EVENT_FORMATS
+
+MAGIC = b"BBRP"
+VERSION = 2
+HEADER = struct.Struct("<4sBQ")
+TIME_SCALE = struct.Struct("<d")
+FRAME = struct.Struct("<HBhhIB")
+MAX_DT = 0xFFFF  # Longest frame time in ms a frame can hold; the game clamps real frame times to it
+
+# Keys the game reads through pygame.key.get_pressed, one bit each
+RECORDED_KEYS = [pygame.K_a, pygame.K_d, pygame.K_w, pygame.K_s, pygame.K_SPACE, pygame.K_LSHIFT]
+
+# type code -> (pygame event type, payload format, payload field names)
+EVENT_FORMATS = {
+    0: (pygame.QUIT, struct.Struct("<"), ()),
+    1: (pygame.KEYDOWN, struct.Struct("<I"), ("key",)),
+    2: (pygame.MOUSEBUTTONDOWN, struct.Struct("<Bhh"), ("button", "x", "y")),
+    3: (pygame.MOUSEBUTTONUP, struct.Struct("<Bhh"), ("button", "x", "y")),
+    4: (pygame.MOUSEMOTION, struct.Struct("<hh"), ("x", "y")),
+}
+EVENT_CODES = {event_type: code for code, (event_type, _, _) in EVENT_FORMATS.items()}
+
+# Frames between flushes of a recording, so a session that is killed before
+# it closes its recording still leaves everything up to the last flush
+FLUSH_INTERVAL = 60
+
+log = logging.getLogger(__name__)
+
+
+class KeyState:
+    # Stand-in for pygame.key.get_pressed() that only knows the recorded keys
+    def __init__(self, bits):
+        self.bits = bits
+
+    def __getitem__(self, key):
+        return key in RECORDED_KEYS and bool(self.bits >> RECORDED_KEYS.index(key) & 1)
+
+    @classmethod
+    def from_keys(cls, *keys):
+        return cls(sum(1 << RECORDED_KEYS.index(key) for key in set(keys)))
+
+    @classmethod
+    def from_pressed(cls, pressed):
+        bits = 0
+        for i, key in enumerate(RECORDED_KEYS):
+            if pressed[key]:
+                bits |= 1 << i
+        return cls(bits)
+
+
+class FrameInput:
+    # Everything the game loop reads from the player in one frame
+    def __init__(self, dt, keys, mouse_pos, events, checksum=None):
+        self.dt = dt
+        self.keys = keys
+        self.mouse_pos = mouse_pos
+        self.events = events
+        self.checksum = checksum  # Only set for frames read from a recording
+
+
+def encode_event(event):
+    code = EVENT_CODES.get(event.type)
+    if code is None:
+        return None  # The game does not react to other events
+    _, fmt, fields = EVENT_FORMATS[code]
+    values = []
+    for field in fields:
+        if field == "x":
+            values.append(event.pos[0])
+        elif field == "y":
+            values.append(event.pos[1])
+        else:
+            values.append(getattr(event, field))
+    return bytes([code]) + fmt.pack(*values)
+
+
+class Recorder:
+    def __init__(self, path, seed, time_scale=1.0):
+        self.file = gzip.open(path, "wb")
+        self.file.write(HEADER.pack(MAGIC, VERSION, seed) + TIME_SCALE.pack(time_scale))
+        self.frames = 0
+
+    def write_frame(self, frame_input, checksum):
+        encoded = [e for e in (encode_event(event) for event in frame_input.events) if e is not None][:255]
+        x, y = frame_input.mouse_pos
+        self.file.write(FRAME.pack(frame_input.dt, frame_input.keys.bits, x, y, checksum, len(encoded)))
+        self.file.write(b"".join(encoded))
+        self.frames += 1
+        if self.frames % FLUSH_INTERVAL == 0:
+            self.file.flush()  # Ends a compressed block that can be read without the rest of the file
+
+    def close(self):
+        self.file.close()
+
+
+class Player:
+    # Reads a recording back one frame at a time
+    def __init__(self, path):
+        self.file = gzip.open(path, "rb")
+        magic, version, self.seed = HEADER.unpack(self.file.read(HEADER.size))
+        if magic != MAGIC or not 1 <= version <= VERSION:
+            raise ValueError(f"{path} is not a BlockBuster recording (version {VERSION} or older)")
+        self.time_scale = 1.0
+        if version >= 2:
+            self.time_scale, = TIME_SCALE.unpack(self.file.read(TIME_SCALE.size))
+        self.frame = 0
+        self.ahead = []  # The frame read ahead by next_dt(), if any
+
+    def next_dt(self):
+        # Recorded dt of the frame read_frame() returns next, None at the end
+        if not self.ahead:
+            self.ahead.append(self.read_frame())
+        return self.ahead[0].dt if self.ahead[0] else None
+
+    def read_frame(self):
+        # Next FrameInput, or None at the end of the recording. A recording
+        # whose session never closed it (killed, power lost) ends with a cut
+        # off frame; the replay stops at the last whole one.
+        if self.ahead:
+            return self.ahead.pop()
+        try:
+            return self.read_whole_frame()
+        except (EOFError, struct.error, IndexError, KeyError, OSError) as e:
+            log.warning("Recording ends early after frame %d: %s", self.frame, e or type(e).__name__)
+            return None
+
+    def read_whole_frame(self):
+        data = self.file.read(FRAME.size)
+        if not data:
+            return None
+        dt, bits, x, y, checksum, count = FRAME.unpack(data)
+        events = []
+        for _ in range(count):
+            event_type, fmt, fields = EVENT_FORMATS[self.file.read(1)[0]]
+            values = dict(zip(fields, fmt.unpack(self.file.read(fmt.size))))
+            if "x" in values:
+                values["pos"] = (values.pop("x"), values.pop("y"))
+            events.append(pygame.event.Event(event_type, values))
+        self.frame += 1
+        return FrameInput(dt, KeyState(bits), (x, y), events, checksum)
+
+    def close(self):
+        self.file.close()
@@ -0,0 +1,96 @@
+import pygame
+
+# The game draws through a Screen instead of the display surface itself.
+# Every drawing call goes to the display surface as usual, and the Screen
+# remembers the area it touched. In "full" mode each frame starts from a
+# cleared window and the whole window is presented, as plain pygame would.
+# In "dirty" mode a frame only restores last frame's areas from the
+# background, and only those areas plus the new ones are sent to the display.
+# Screens with a static backdrop (the menus) make it the background, so their
+# frames only touch what moves on top of it.
+
+RENDER_MODES = ["full", "dirty"]
+FULL_UPDATE_AREA = 0.5  # Present the whole window once this share of it is dirty
+MAX_DIRTY_RECTS = 200   # More rects than this cost more to present than the window
+
+
+class Screen:
+    def __init__(self, surface, mode="full", background=None):
+        self.surface = surface
+        self.mode = mode
+        if background is None:
+            background = pygame.Surface(surface.get_size())
+        self.blank = background
+        self.background = background  # What the window shows where nothing is drawn
+        self.drawn = []   # Areas drawn this frame
+        self.erased = []  # Areas drawn last frame, cleared at the start of this one
+        self.window_area = surface.get_width() * surface.get_height()
+
+    def __getattr__(self, name):
+        # get_size, set_clip and friends come straight from the display surface
+        return getattr(self.surface, name)
+
+    # Drawing, with the same arguments as the pygame calls they wrap
+    def blit(self, source, dest, area=None, special_flags=0):
+        rect = self.surface.blit(source, dest, area, special_flags)
+        self.drawn.append(rect)
+        return rect
+
+    def blits(self, blit_sequence, doreturn=True):
+        rects = self.surface.blits(blit_sequence, doreturn=True)
+        self.drawn.extend(rects)
+        return rects if doreturn else None
+
+    def fill(self, color, rect=None, special_flags=0):
+        rect = self.surface.fill(color, rect, special_flags)
+        self.drawn.append(rect)
+        return rect
+
+    def draw_rect(self, color, rect, width=0, border_radius=0):
+        rect = pygame.draw.rect(self.surface, color, rect, width, border_radius)
+        self.drawn.append(rect)
+        return rect
+
+    def draw_circle(self, color, center, radius, width=0):
+        rect = pygame.draw.circle(self.surface, color, center, radius, width)
+        self.drawn.append(rect)
+        return rect
+
+    def draw_lines(self, color, closed, points, width=1):
+        rect = pygame.draw.lines(self.surface, color, closed, points, width)
+        self.drawn.append(rect)
+        return rect
+
+    # Frames
+    def set_background(self, background=None):
+        # Show background (the blank one if None) where nothing is drawn from
+        # now on. A new background is drawn right away and presented whole.
+        if background is None:
+            background = self.blank
+        if background is not self.background:
+            self.background = background
+            self.surface.blit(background, (0, 0))
+            self.erased = [self.surface.get_rect()]
+
+    def clear(self):
+        if self.mode == "dirty" and not self.too_dirty(self.drawn):
+            background = self.background
+            self.surface.blits([(background, rect, rect) for rect in self.drawn], doreturn=False)
+            self.erased = self.drawn
+        else:
+            self.surface.blit(self.background, (0, 0))
+            self.erased = [self.surface.get_rect()]
+        self.drawn = []
+
+    def present(self):
+        # A still screen draws the same areas it erased, count those once
+        erased = set(map(tuple, self.erased))
+        rects = self.erased + [rect for rect in self.drawn if tuple(rect) not in erased]
+        if self.mode == "dirty" and not self.too_dirty(rects):
+            pygame.display.update(rects)
+        else:
+            pygame.display.update()
+
+    def too_dirty(self, rects):
+        # Past this, one whole-window operation is cheaper than many small ones
+        return len(rects) > MAX_DIRTY_RECTS or sum(r.width * r.height for r in rects) > self.window_area * FULL_UPDATE_AREA
@@ -1,8 +1,30 @@
 import pygame
 import random
+import logging
 import sys
 import os
 import json
+import zlib
+import argparse
+import survival
+import replay
+import benchmark
+import particles
+import entities
+import effects
+import surfaces
+import profiling
+import logs
+import assets
+import io
+import functools
+import screen
+import timing
+import atexit
+import tempfile
+import threading
+import time
+from collections import OrderedDict
 
 def resource_path(relative_path):
     """ Get the absolute path to a resource, works for PyInstaller """
@@ -13,24 +35,86 @@ def resource_path(relative_path):
         base_path = os.path.abspath(".")
     return os.path.join(base_path, relative_path)
 
-# Initialize
-pygame.init()
-pygame.mixer.init()
+log = logging.getLogger("square")  # See logs.py, set up by main()
+
+# Command line options
+def positive_float(text):
+    value = float(text)
+    if not value > 0:
+        raise argparse.ArgumentTypeError(f"must be greater than 0, got {text}")
+    return value
+
+parser = argparse.ArgumentParser(description="Block Buster")
+parser.add_argument("--record", metavar="FILE", help="record the random seed and all input to FILE")
+parser.add_argument("--replay", metavar="FILE", help="play back a recording made with --record")
+parser.add_argument("--fast", action="store_true", help="run as fast as the CPU allows instead of at 60 FPS")
+parser.add_argument("--time-scale", type=positive_float, default=1.0, metavar="X",
+                    help="game speed, e.g. 0.25 for slow motion or 10 to fast-forward (F6 cycles it in game, F7 freezes time)")
+parser.add_argument("--render-fps", type=int, default=60, metavar="N", help="frames drawn per second (default: 60), the game itself always runs at 60 steps per second")
+parser.add_argument("--seed", type=int, help="random seed for this session (default: random)")
+parser.add_argument("--render-mode", choices=screen.RENDER_MODES, default="full",
+                    help="full: redraw and present the whole window each frame, dirty: only the areas that changed")
+parser.add_argument("--surface-format", choices=surfaces.SURFACE_FORMATS, default="display",
+                    help="display: keep images and cached surfaces in the window's pixel format, native: as they were made (to measure the difference)")
+parser.add_argument("--benchmark", nargs="*", metavar="SCENARIO", help="run benchmark scenarios (default: all) and report frame times as JSON")
+parser.add_argument("--frames", type=int, default=600, help="frames measured per benchmark scenario")
+parser.add_argument("--warmup", type=int, default=30, help="frames run before measuring each benchmark scenario")
+parser.add_argument("--output", metavar="FILE", default="benchmark.json", help="benchmark report file (default: benchmark.json)")
+parser.add_argument("--profile-frames", type=int, metavar="N", help="profile the first N frames with cProfile and a stack sampler (F4 profiles the next N in game)")
+parser.add_argument("--profile-output", metavar="PATH", default="profile",
+                    help="name of the profile files, numbered per capture: PATH-1.pstats and PATH-1.collapsed (default: profile)")
+parser.add_argument("--log-level", choices=logs.LOG_LEVELS, default="INFO",
+                    help="least important messages to show (default: INFO, silent in normal play; DEBUG adds game state diagnostics)")
+parser.add_argument("--profile-csv", metavar="FILE", help="write the time of each frame phase and the live entity counts to FILE, one row per frame (F3 shows them in game)")
+
+# Importing this module only defines the game. main() parses the command line,
+# opens the window and runs it; everything that needs a window, the mixer or
+# the command line is set up there, below it is None until then.
+args = None
+replay_player = None  # replay.Player when playing back a recording
+recorder = None       # replay.Recorder when recording
+
+# Randomness: every random decision in the game comes from this generator,
+# so a session is reproduced by its seed plus the recorded input
+rng = None
 
 # Window setup
 WIDTH, HEIGHT = 800, 600
-WIN = pygame.display.set_mode((WIDTH, HEIGHT))
-pygame.display.set_caption("Block Buster")
+WIN = None  # screen.Screen over the display surface
 
+# Menu background: decoding and scaling the 2.6 MB PNG is the slowest part of
+# startup, so the scaled picture is kept in CACHE_DIR as an uncompressed BMP
+# that later runs load instead
+MENU_BACKGROUND_FILE = "menu_background.png"
+CACHE_DIR = ".cache"  # Files derived from the assets, safe to delete
 
-# Load the background image with error handling
-try:
-    menu_background = pygame.image.load(resource_path("menu_background.png"))
-    menu_background = pygame.transform.scale(menu_background, (WIDTH, HEIGHT))
-except Exception as e:
-    print(f"Error loading menu background: {e}")
-    menu_background = pygame.Surface((WIDTH, HEIGHT))
-    menu_background.fill((30, 30, 30))
+def load_menu_background():
+    source = resource_path(MENU_BACKGROUND_FILE)
+    cached = os.path.join(CACHE_DIR, f"menu_background_{WIDTH}x{HEIGHT}.bmp")
+    try:
+        if os.path.getmtime(cached) >= os.path.getmtime(source):
+            return surfaces.image(cached)
+    except (OSError, pygame.error):
+        pass  # Not cached yet, or the PNG changed since
+    try:
+        image = surfaces.image(source, (WIDTH, HEIGHT))
+    except Exception as e:
+        log.error("Error loading menu background: %s", e)
+        image = surfaces.new((WIDTH, HEIGHT))
+        image.fill((30, 30, 30))
+        return image
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        # Save under a temporary name first, so a half-written file is never picked up
+        tmp_path = cached + ".tmp.bmp"
+        pygame.image.save(image, tmp_path)
+        os.replace(tmp_path, cached)
+    except (OSError, pygame.error) as e:
+        log.warning("Error caching menu background: %s", e)
+    return image
+
+def get_menu_background():
+    return game_assets.get("image/menu_background", load_menu_background)
 
 # Colors
 WHITE = (255, 255, 255)
@@ -40,14 +124,69 @@ BLACK = (0, 0, 0)
 GREEN = (0, 255, 0)
 YELLOW = (255, 255, 50)
 
-# Fonts
-font = pygame.font.SysFont("Arial", 28)
-big_font = pygame.font.SysFont("Arial", 50)
+# Font registry: each font is created once and shared by every screen
+fonts = {}
+
+def get_font(name, size, bold=False):
+    key = (name.lower(), size, bold)
+    if key not in fonts:
+        fonts[key] = pygame.font.SysFont(name, size, bold=bold)
+    return fonts[key]
+
+# Text cache: rendered text surfaces, least recently used entries are dropped first
+TEXT_CACHE_SIZE = 256
+text_cache = OrderedDict()
+
+def render_text(font, text, color):
+    key = (font, text, color)
+    surf = text_cache.get(key)
+    if surf is None:
+        surf = text_cache[key] = surfaces.text(font, text, color)
+        if len(text_cache) > TEXT_CACHE_SIZE:
+            text_cache.popitem(last=False)
+    else:
+        text_cache.move_to_end(key)
+    return surf
+
+# Digit atlas: one glyph surface per digit, so changing numbers never rasterize text
+digit_atlases = {}
+
+def get_digit_atlas(font, color):
+    key = (font, color)
+    if key not in digit_atlases:
+        digit_atlases[key] = {ch: surfaces.text(font, ch, color) for ch in "-0123456789"}
+    return digit_atlases[key]
+
+def draw_number(value, font, color, pos):
+    # Blit a number glyph by glyph from the atlas, returns the x after the last digit
+    atlas = get_digit_atlas(font, color)
+    x, y = pos
+    glyphs = []
+    for ch in str(int(value)):
+        glyph = atlas[ch]
+        glyphs.append((glyph, (x, y)))
+        x += glyph.get_width()
+    WIN.blits(glyphs, doreturn=False)
+    return x
+
+def draw_labeled_number(label, value, font, color, pos):
+    # HUD text like "Score: 12": cached label followed by atlas digits
+    label_surf = render_text(font, label, color)
+    WIN.blit(label_surf, pos)
+    return draw_number(value, font, color, (pos[0] + label_surf.get_width(), pos[1]))
+
+font = None      # Arial 28
+big_font = None  # Arial 50
 
 # Clock
-clock = pygame.time.Clock()
+clock = None
 FPS = 60
 
+# Fixed-timestep simulation: the game advances in steps of SIM_DT ms no matter how
+# often frames are drawn; frames draw the state interpolated between the last two steps
+SIM_DT = 1000 / FPS
+MAX_STEPS_PER_FRAME = 5  # After a longer stall the game skips ahead instead of catching up
+
 # Sound files
 background_music = resource_path("background_music.mp3")
 shoot_sound = resource_path("shoot.mp3")
@@ -58,11 +197,11 @@ powerup_sound = resource_path("powerup.wav")
 victory_music = resource_path("victory_music.mp3")
 arena_music = resource_path("arena_music.mp3")
 
-# Mixer channels
-channel_fx_shoot = pygame.mixer.Channel(1)
-channel_fx_hit = pygame.mixer.Channel(2)
-channel_fx_ui = pygame.mixer.Channel(3)
-channel_fx_powerup = pygame.mixer.Channel(4)
+# Mixer channels (1-4, see init_audio)
+channel_fx_shoot = None
+channel_fx_hit = None
+channel_fx_ui = None
+channel_fx_powerup = None
 
 
 # Sound volumes (defaults)
@@ -72,8 +211,78 @@ hit_sound_volume = 0.5
 click_sound_volume = 0.5
 powerup_sound_volume = 0.5
 
+# --- Background file writer ---
+def write_file_atomic(path, text):
+    # Write to a temp file next to the target, then swap it in with one rename,
+    # so a crash or power cut never leaves a half-written file behind
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        if os.path.exists(path):
+            os.chmod(tmp_path, os.stat(path).st_mode & 0o777)  # mkstemp files are private, keep the old mode
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+class BackgroundWriter:
+    # Writes files on a worker thread so the game loop never waits for the disk.
+    # Queued writes to the same path are coalesced: only the newest text is written.
+    def __init__(self):
+        self.pending = {}  # path -> (text, time.monotonic() deadline)
+        self.busy = False
+        self.condition = threading.Condition()
+        self.thread = threading.Thread(target=self.run, name="file-writer", daemon=True)
+        self.thread.start()
+
+    def write(self, path, text, delay=0):
+        # With a delay (seconds) the write waits for a quiet period:
+        # every newer write to the same path restarts the wait
+        with self.condition:
+            self.pending[path] = (text, time.monotonic() + delay)
+            self.condition.notify_all()
+
+    def flush(self, wait=True):
+        # Write everything queued right away, optionally blocking until it is on disk
+        with self.condition:
+            for path, (text, _) in self.pending.items():
+                self.pending[path] = (text, 0)
+            self.condition.notify_all()
+            while wait and (self.pending or self.busy):
+                self.condition.wait()
+
+    def run(self):
+        while True:
+            with self.condition:
+                while True:
+                    now = time.monotonic()
+                    due = [path for path, (_, deadline) in self.pending.items() if deadline <= now]
+                    if due:
+                        break
+                    next_deadline = min((deadline for _, deadline in self.pending.values()), default=None)
+                    self.condition.wait(None if next_deadline is None else next_deadline - now)
+                path = due[0]
+                text, _ = self.pending.pop(path)
+                self.busy = True
+            try:
+                write_file_atomic(path, text)
+            except Exception as e:
+                log.error("Error writing %s: %s", path, e)
+            with self.condition:
+                self.busy = False
+                self.condition.notify_all()
+
+file_writer = None  # BackgroundWriter, started by main()
+
 # --- Settings persistence logic ---
 SETTINGS_FILE = "settings.json"
+SETTINGS_SAVE_DELAY = 0.5  # seconds of quiet before settings are written
+
 def save_settings():
     settings = {
         "background_music_volume": background_music_volume,
@@ -82,11 +291,9 @@ def save_settings():
         "click_sound_volume": click_sound_volume,
         "powerup_sound_volume": powerup_sound_volume
     }
-    try:
-        with open(SETTINGS_FILE, "w") as f:
-            json.dump(settings, f)
-    except Exception as e:
-        print(f"Error saving settings: {e}")
+    # Slider drags call this on every mouse move: the values live in memory and the
+    # file is written in the background once the sliders have been still for a moment
+    file_writer.write(SETTINGS_FILE, json.dumps(settings), delay=SETTINGS_SAVE_DELAY)
 
 def load_settings():
     global background_music_volume, shoot_sound_volume, hit_sound_volume, click_sound_volume, powerup_sound_volume
@@ -99,52 +306,89 @@ def load_settings():
         click_sound_volume = settings.get("click_sound_volume", click_sound_volume)
         powerup_sound_volume = settings.get("powerup_sound_volume", powerup_sound_volume)
     except Exception as e:
-        print(f"Error loading settings: {e}")
+        log.warning("Error loading settings: %s", e)
+
+# Everything loaded from disk goes into this registry, see assets.py.
+# Names are "image/...", "sound/..." and "music/...".
+game_assets = assets.AssetRegistry()
 
-# Load settings at startup
-load_settings()
+# Music tracks are read into memory while loading and streamed from there
+MUSIC_FILES = {
+    "background": background_music,
+    "arena": arena_music,
+    "victory": victory_music,
+}
+
+def read_music(name):
+    try:
+        return assets.read_file(MUSIC_FILES[name])
+    except OSError as e:
+        log.error("Error loading music '%s': %s", name, e)
+        return None
+
+def load_music(name):
+    data = game_assets.get("music/" + name, functools.partial(read_music, name))
+    if data is None:
+        raise pygame.error(f"Music '{name}' is not available")
+    pygame.mixer.music.load(io.BytesIO(data), "mp3")
 
 # Play music
 def play_background_music():
     pygame.mixer.music.set_volume(background_music_volume)
     if not pygame.mixer.music.get_busy():
-        pygame.mixer.music.load(background_music)
+        load_music("background")
         pygame.mixer.music.play(-1)
 
-def play_fx(mp3_file, channel, volume):
-    fx = pygame.mixer.Sound(mp3_file)
+# Sound bank: every effect is decoded once and kept in memory
+SOUND_FILES = {
+    "shoot": shoot_sound,
+    "hit": hit_sound,
+    "game_over": game_over_sound,
+    "click": click_sound,
+    "powerup": powerup_sound,
+}
+
+def load_sound(name):
+    try:
+        return pygame.mixer.Sound(SOUND_FILES[name])
+    except (pygame.error, OSError) as e:  # Undecodable or missing file
+        log.error("Error loading sound '%s': %s", name, e)
+        return None
+
+class SoundBank(dict):
+    # sounds["hit"] takes the effect from the asset registry the first time it
+    # is played, decoding it then if the loading screen didn't
+    def __missing__(self, name):
+        sound = self[name] = game_assets.get("sound/" + name, functools.partial(load_sound, name))
+        return sound
+
+sounds = SoundBank()
+
+def play_fx(fx, channel, volume):
+    # fx is a decoded sound from the bank, volume is applied at play time (no reload)
+    if fx is None:
+        return
     fx.set_volume(volume)
     channel.play(fx)
 
 # Game state
 game_state = "menu"
 pause = False
+game_clock = None  # timing.GameClock, the game time read by everything
+mouse_pos = (0, 0)  # Mouse position for this frame (live or from a replay)
 
 # Add a timer for the "GET READY!" state
 get_ready_start_time = 0
 get_ready_duration = 2000  # 2 seconds
 
-# Player (with float position for smooth movement)
+# Player (shared by Arena mode, Survival keeps its own in survival_state)
 player = pygame.Rect(WIDTH//2 - 25, HEIGHT - 60, 50, 50)
-player_pos_x = float(player.x)
-player_pos_y = float(player.y)
 player_speed = 25
-sprint_speed = 35
-shield = False
-shield_duration = 3000  # milliseconds
-shield_end_time = 0
 
 # Shield animation
 shield_animation_radius = 60  # Initial radius of the shield animation
 shield_animation_growth = 2   # Growth rate of the shield animation
 
-# Sprint
-energy = 100
-max_energy = 100
-energy_drain_rate = 3.0  # Much faster drain for sprint
-energy_cooldown = 5000   # 5 seconds cooldown before instant refill
-energy_depleted_time = 0
-
 # Dash cooldown
 dash_cooldown = 1200  # Reduced cooldown for more frequent dashing
 last_dash_time = 0    # Tracks the last time the player dashed
@@ -158,59 +402,24 @@ dash_animation_max_outline = 30  # Max outline thickness
 dash_animation_min_outline = 3   # Min outline thickness
 dash_animation_max_alpha = 180   # Max alpha for the outline
 
-# Bullets
-bullets = []
+# Bullets (flag: piercing)
+bullets = entities.ProjectilePool()
 bullet_speed = 15  # Player bullet speed
 
 # Shooting cooldown
 shoot_cooldown = 300  # Cooldown time in milliseconds
 last_shot_time = 0    # Tracks the last time a bullet was fired
 
-
-# Enemies
-enemies = []
-enemy_spawn_time = 1000
-enemy_speed = 2  # Start slower at level 1
-last_enemy_spawn = pygame.time.get_ticks()
-
-# Boss variables
-boss_active = False
-boss = None
-boss_health = 100
-boss_max_health = 100
-boss_attack_cooldown = 1000
-boss_last_attack = 0
-boss_bullets = []
-boss_entry_y = 60
-
-# Enemy spawn cooldown
-enemy_spawn_cooldown = 2000  # Cooldown time in milliseconds (1 second)
-enemy_spawn_resume_time = 0  # Tracks when enemy spawning can resume
-
 # Enemy bullets
-enemy_bullets = []
+enemy_bullets = entities.ProjectilePool()
 enemy_bullet_speed = 12  # Enemy bullet speed
 enemy_shoot_cooldown = 1000  # Cooldown time in milliseconds
 last_enemy_shoot_time = 0    # Tracks the last time an enemy shot
 
-
-# Power-ups
-powerups = []
-powerup_spawn_time = 5000
-last_powerup_spawn = pygame.time.get_ticks()
-
-# Gun upgrade system
-GUN_UPGRADE_DURATION = 8000  # 8 seconds duration for upgrades
-rapid_fire_cooldown = 100  # ms, for rapid fire
-# Store upgrades as a dict: {upgrade_name: expiration_time}
-gun_upgrades = {}
-
-# Score & health
-score = 0
-health = 5
-max_health = 5
-level = 0
-high_score = 0
+# Survival mode: the rules live in survival.py, this is the run being played and drawn
+survival_state = None  # Started by reset_game()
+sprint_trail = effects.new_trail()  # Recent player positions while sprinting
+display_health = 0  # Health bar value, eases toward the real health
 
 # Splash effect
 splash_active = False
@@ -222,10 +431,13 @@ health_blink_active = False
 health_blink_start_time = 0
 health_blink_duration = 1000  # Duration of the blink effect in milliseconds
 
+effect_timers = timing.Scheduler()  # Ends the splash and blink effects on game time
+
 # Arena mode variables
 arena_enemy = pygame.Rect(WIDTH//2 - 25, 50, 50, 50)  # Enemy starts at the top center
 arena_enemy_health = 5
 arena_enemy_max_health = 5
+arena_previous = (player.topleft, arena_enemy.topleft)  # Where player and enemy were one step ago, for drawing
 arena_enemy_speed = 7
 arena_enemy_dodge_cooldown = 2000  # 2 seconds
 arena_enemy_last_dodge = 0
@@ -236,16 +448,12 @@ player_dodge_cooldown = 2000  # 2 seconds
 player_last_dodge = 0
 
 # Arena mode destruction effect
-enemy_pieces = []  # List to store enemy pieces
+arena_particles = None  # particles.ParticleSystem, pieces of the destroyed enemy
 enemy_destroyed = False  # Flag to track if the enemy is destroyed
 enemy_destroy_start_time = 0  # Timer for the destruction effect
 enemy_destroy_duration = 2000  # Duration of the destruction effect in milliseconds
 
 
-# Survival mode destruction effect (support multiple simultaneous explosions)
-survival_explosions = []  # Each item: {"pieces": [...], "start_time": int}
-survival_enemy_destroy_duration = 2000  # Duration of the destruction effect in milliseconds
-
 global victory_music_playing
 victory_music_playing = False  # Flag to track if victory music is playing
 
@@ -275,7 +483,9 @@ BUTTONS = {
 }
 # --- Leaderboard logic ---
 LEADERBOARD_FILE = "leaderboard.txt"
-def load_leaderboard():
+leaderboard_scores = None  # Loaded from disk once, then served from memory
+
+def read_leaderboard_file():
     scores = []
     if os.path.exists(LEADERBOARD_FILE):
         with open(LEADERBOARD_FILE, "r") as f:
@@ -287,76 +497,232 @@ def load_leaderboard():
                     continue
     return sorted(scores, reverse=True)[:10]
 
+def load_leaderboard():
+    global leaderboard_scores
+    if leaderboard_scores is None:
+        leaderboard_scores = read_leaderboard_file()
+    return leaderboard_scores
+
 def save_score(new_score):
+    # Update the in-memory board now, the file is rewritten in the background
     scores = load_leaderboard()
     scores.append(new_score)
-    scores = sorted(scores, reverse=True)[:10]
-    with open(LEADERBOARD_FILE, "w") as f:
-        for s in scores:
-            f.write(f"{s}\n")
-
-def draw_leaderboard():
-    WIN.blit(menu_background, (0, 0))
-    # Card background for leaderboard (smaller, more centered)
-    card_width, card_height = 320, 340
-    card_rect = pygame.Rect(WIDTH//2 - card_width//2, HEIGHT//2 - card_height//2, card_width, card_height)
+    scores.sort(reverse=True)
+    del scores[10:]
+    file_writer.write(LEADERBOARD_FILE, "".join(f"{s}\n" for s in scores))
+
+# Card screens (leaderboard, help, settings): the menu background, the card's
+# drop shadow, the card and its title never change, so each screen composites
+# them into one layer the first time it is shown. A frame blits that layer and
+# draws only what moves on top.
+def centered_card(card_width, card_height):
+    return pygame.Rect(WIDTH//2 - card_width//2, HEIGHT//2 - card_height//2, card_width, card_height)
+
+LEADERBOARD_CARD = centered_card(320, 340)  # Smaller, more centered
+HELP_CARD = centered_card(540, 480)
+SETTINGS_CARD = centered_card(480, 380)  # Matches leaderboard: larger, more padding
+
+card_layers = {}  # Screen name -> composited static layer
+MENU_STATES = ["menu", "leaderboard", "help", "settings"]  # Game states drawn over a static background
+
+def render_card_layer(card_rect, shadow_offset, shadow_color, shadow_radius, card_color, border_color, card_radius, title, title_font, title_y):
+    layer = surfaces.new((WIDTH, HEIGHT))
+    layer.blit(get_menu_background(), (0, 0))
     # Drop shadow
-    shadow_offset = 8
-    shadow_surf = pygame.Surface((card_width, card_height), pygame.SRCALPHA)
-    pygame.draw.rect(shadow_surf, (0,0,0,80), shadow_surf.get_rect(), border_radius=22)
-    WIN.blit(shadow_surf, (card_rect.x + shadow_offset, card_rect.y + shadow_offset))
+    shadow_surf = pygame.Surface(card_rect.size, pygame.SRCALPHA)
+    pygame.draw.rect(shadow_surf, shadow_color, shadow_surf.get_rect(), border_radius=shadow_radius)
+    layer.blit(shadow_surf, (card_rect.x + shadow_offset, card_rect.y + shadow_offset))
     # Card
-    card_surf = pygame.Surface((card_width, card_height), pygame.SRCALPHA)
-    pygame.draw.rect(card_surf, (36, 44, 70, 235), card_surf.get_rect(), border_radius=18)
-    pygame.draw.rect(card_surf, (80, 120, 200, 60), card_surf.get_rect(), width=2, border_radius=18)  # border
-    WIN.blit(card_surf, (card_rect.x, card_rect.y))
-    # Title (smaller, modern)
-    title_font = pygame.font.SysFont("Arial", 32, bold=True)
-    title = title_font.render("LEADERBOARD", True, (200,220,255))
-    WIN.blit(title, (WIDTH//2 - title.get_width()//2, card_rect.y + 22))
+    card_surf = pygame.Surface(card_rect.size, pygame.SRCALPHA)
+    pygame.draw.rect(card_surf, card_color, card_surf.get_rect(), border_radius=card_radius)
+    pygame.draw.rect(card_surf, border_color, card_surf.get_rect(), width=2, border_radius=card_radius)  # border
+    layer.blit(card_surf, card_rect.topleft)
+    # Title
+    title_surf = title_font.render(title, True, (200,220,255))
+    layer.blit(title_surf, (WIDTH//2 - title_surf.get_width()//2, card_rect.y + title_y))
+    return layer
+
+def render_leaderboard_layer():
+    return render_card_layer(LEADERBOARD_CARD, 8, (0,0,0,80), 22, (36, 44, 70, 235), (80, 120, 200, 60), 18,
+                             "LEADERBOARD", get_font("Arial", 32, bold=True), 22)  # Title smaller, modern
+
+def render_help_layer():
+    return render_card_layer(HELP_CARD, 10, (0, 0, 0, 120), 22, (30, 40, 60, 235), (30, 40, 60, 235), 22,
+                             "HELP & CONTROLS", get_font("arial", 38, bold=True), 28)
+
+def render_settings_layer():
+    layer = render_card_layer(SETTINGS_CARD, 10, (0, 0, 0, 120), 22, (30, 40, 60, 235), (30, 40, 60, 235), 22,
+                              "SETTINGS", get_font("arial", 38, bold=True), 28)
+    # Labels for each slider, above the sliders inside the card
+    settings_label_font = get_font("arial", 24)
+    label_x = SETTINGS_CARD.x + 44
+    for text, y in (("Music Volume", 90), ("Shoot Volume", 150), ("Hit Volume", 210)):
+        layer.blit(settings_label_font.render(text, True, WHITE), (label_x, SETTINGS_CARD.y + y))
+    return layer
+
+HELP_LINES = [
+    "Controls:",
+    "  - Move: A/D (left/right), W/S (up/down in Arena)",
+    "  - Shoot: SPACEBAR",
+    "  - Sprint: Hold LSHIFT (Survival)",
+    "  - Dash: LSHIFT (Arena, with cooldown)",
+    "  - Pause: ESC",
+    "",
+    "Abilities & Power-ups:",
+    "  - Health: Restores 1 HP",
+    "  - Shield: Temporary invincibility",
+    "  - Clear Enemies: Destroys all enemies on screen",
+    "  - Double Gun: Shoot 2 bullets at once",
+    "  - Triple Gun: Shoot 3 bullets at once",
+    "  - Rapid Gun: Faster shooting",
+    "  - Piercing Gun: Bullets pass through enemies",
+    "",
+    "Survival Mode:",
+    "  - Survive waves, collect power-ups, defeat the boss!",
+    "",
+    "Arena Mode:",
+    "  - 1v1 duel, use dashes and upgrades to win!",
+    "",
+    "Press the MENU button below to return."
+]
+HELP_TEXT_COLOR = (220, 230, 255)
+
+def wrap_text(text, font, max_width):
+    words = text.split(' ')
+    lines = []
+    current = ''
+    for word in words:
+        test = current + (' ' if current else '') + word
+        if font.size(test)[0] <= max_width:
+            current = test
+        else:
+            if current:
+                lines.append(current)
+            current = word
+    if current:
+        lines.append(current)
+    return lines if lines else ['']
+
+def render_help_text(help_font, width, line_height):
+    # All of HELP_LINES word wrapped to width, one line every line_height pixels
+    wrapped_lines = []
+    for line in HELP_LINES:
+        if line.strip() == '':
+            wrapped_lines.append('')
+        else:
+            wrapped_lines.extend(wrap_text(line, help_font, width))
+    surface = pygame.Surface((width, len(wrapped_lines) * line_height), pygame.SRCALPHA)
+    for i, text in enumerate(wrapped_lines):
+        if text:
+            # Lines never overlap, so copy the text pixels as they are instead of blending
+            surface.blit(help_font.render(text, True, HELP_TEXT_COLOR), (0, i * line_height), special_flags=pygame.BLEND_RGBA_MAX)
+    return surfaces.prepare(surface, rle=True)
+
+help_text_cache = None  # ((font, width, line_height), surface)
+
+def get_help_text(help_font, width, line_height):
+    # The help text laid out once, the screen scrolls by blitting part of it.
+    # Only a different font or text width lays it out again.
+    global help_text_cache
+    key = (help_font, width, line_height)
+    if help_text_cache is None or help_text_cache[0] != key:
+        help_text_cache = (key, render_help_text(help_font, width, line_height))
+    return help_text_cache[1]
+
+def draw_card_layer(name, render):
+    # The layer is the window's background, see Screen.set_background
+    layer = card_layers.get(name)
+    if layer is None:
+        layer = card_layers[name] = render()
+    WIN.set_background(layer)
+
+def draw_leaderboard():
+    draw_card_layer("leaderboard", render_leaderboard_layer)
+    card_rect = LEADERBOARD_CARD
     # Scores (smaller font, more spacing)
     scores = load_leaderboard()
-    score_font = pygame.font.SysFont("Arial", 22, bold=False)
+    score_font = get_font("Arial", 22)
     y_start = card_rect.y + 70
     line_height = 28
     if not scores:
-        no_scores = score_font.render("No scores yet!", True, (220,220,220))
+        no_scores = render_text(score_font, "No scores yet!", (220,220,220))
         WIN.blit(no_scores, (WIDTH//2 - no_scores.get_width()//2, y_start + 2*line_height))
     else:
         for i, score in enumerate(scores[:10]):
             color = (255, 230, 120) if i==0 else (220, 220, 220) if i<3 else (180, 200, 255)
-            entry = score_font.render(f"{i+1}. {score}", True, color)
+            entry = render_text(score_font, f"{i+1}. {score}", color)
             WIN.blit(entry, (WIDTH//2 - entry.get_width()//2, y_start + i*line_height))
     # Menu button (bottom center, matches settings screen)
     draw_button("MENU", BUTTONS["menu_leaderboard"], BLUE)
 
-def draw_button(text, rect, color, alpha=150):
+# Button cache: every button state is rendered once into a single surface
+BUTTON_THEME = {
+    "shadow": (0, 0, 0, 70),
+    "hover_overlay": (255, 255, 255, 40),
+    "label": (240, 240, 255),
+    "label_hover": (255, 255, 180),
+    "border_blue": (80, 120, 200),
+    "border_red": (200, 80, 80),
+    "border_default": (0, 200, 255),
+}
+button_cache = {}  # (text, size, color, alpha, hovered) -> premultiplied surface
+button_cache_window_size = None
+
+def invalidate_button_cache():
+    button_cache.clear()
+
+def set_button_theme(**colors):
+    # Changing the theme makes every cached button stale
+    BUTTON_THEME.update(colors)
+    invalidate_button_cache()
+
+def render_button(text, size, color, alpha, is_hovered):
     # Modern button: drop shadow, colored border, card style, compact, hover effect
-    mouse_pos = pygame.mouse.get_pos()
-    is_hovered = rect.collidepoint(mouse_pos)
-    # Drop shadow
+    width, height = size
     shadow_offset = 5
-    shadow_surf = pygame.Surface((rect.width, rect.height), pygame.SRCALPHA)
-    pygame.draw.rect(shadow_surf, (0,0,0,70), shadow_surf.get_rect(), border_radius=16)
-    WIN.blit(shadow_surf, (rect.x + shadow_offset, rect.y + shadow_offset))
+    surf = pygame.Surface((width + shadow_offset, height + shadow_offset), pygame.SRCALPHA)
+    # Layers are composited premultiplied so the cached surface blends exactly
+    # like drawing them one after another onto the window
+    def add_layer(layer, pos):
+        surf.blit(layer.premul_alpha(), pos, special_flags=pygame.BLEND_PREMULTIPLIED)
+    # Drop shadow
+    shadow_surf = pygame.Surface((width, height), pygame.SRCALPHA)
+    pygame.draw.rect(shadow_surf, BUTTON_THEME["shadow"], shadow_surf.get_rect(), border_radius=16)
+    add_layer(shadow_surf, (shadow_offset, shadow_offset))
     # Card/button background
-    btn_surf = pygame.Surface((rect.width, rect.height), pygame.SRCALPHA)
+    btn_surf = pygame.Surface((width, height), pygame.SRCALPHA)
     base_color = color if not is_hovered else (min(255, color[0]+30), min(255, color[1]+30), min(255, color[2]+30))
     pygame.draw.rect(btn_surf, (*base_color, alpha), btn_surf.get_rect(), border_radius=14)
     # Border (matches leaderboard)
-    border_color = (80, 120, 200) if color == BLUE else (200, 80, 80) if color == RED else (0, 200, 255)
+    border_color = BUTTON_THEME["border_blue"] if color == BLUE else BUTTON_THEME["border_red"] if color == RED else BUTTON_THEME["border_default"]
     pygame.draw.rect(btn_surf, border_color, btn_surf.get_rect(), width=2, border_radius=14)
-    WIN.blit(btn_surf, (rect.x, rect.y))
+    add_layer(btn_surf, (0, 0))
     # Hover effect: subtle white overlay
     if is_hovered:
-        hover_surf = pygame.Surface((rect.width, rect.height), pygame.SRCALPHA)
-        pygame.draw.rect(hover_surf, (255,255,255,40), hover_surf.get_rect(), border_radius=14)
-        WIN.blit(hover_surf, (rect.x, rect.y))
+        hover_surf = pygame.Surface((width, height), pygame.SRCALPHA)
+        pygame.draw.rect(hover_surf, BUTTON_THEME["hover_overlay"], hover_surf.get_rect(), border_radius=14)
+        add_layer(hover_surf, (0, 0))
     # Label: bold, modern, slightly smaller
-    label_font = pygame.font.SysFont("Arial", 22, bold=True)
-    label_color = (240,240,255) if not is_hovered else (255,255,180)
-    label = label_font.render(text, True, label_color)
-    WIN.blit(label, (rect.x + rect.width//2 - label.get_width()//2, rect.y + rect.height//2 - label.get_height()//2))
+    label_font = get_font("Arial", 22, bold=True)
+    label_color = BUTTON_THEME["label"] if not is_hovered else BUTTON_THEME["label_hover"]
+    # Font surfaces can have padded rows that premul_alpha() mishandles, so copy first
+    label = label_font.render(text, True, label_color).copy()
+    add_layer(label, (width//2 - label.get_width()//2, height//2 - label.get_height()//2))
+    # Blitted with a blend mode, which RLE would slow down
+    return surfaces.prepare(surf)
+
+def draw_button(text, rect, color, alpha=150):
+    global button_cache_window_size
+    # Cached buttons are only valid for the window they were rendered for
+    if WIN.get_size() != button_cache_window_size:
+        invalidate_button_cache()
+        button_cache_window_size = WIN.get_size()
+    is_hovered = rect.collidepoint(mouse_pos)
+    key = (text, rect.size, color, alpha, is_hovered)
+    surf = button_cache.get(key)
+    if surf is None:
+        surf = button_cache[key] = render_button(text, rect.size, color, alpha, is_hovered)
+    WIN.blit(surf, rect.topleft, special_flags=pygame.BLEND_PREMULTIPLIED)
 
 # Sliders
 slider_width = 200
@@ -375,21 +741,19 @@ def draw_slider(rect, volume):
     # Draw drop shadow
     shadow_offset = 4
     shadow_rect = pygame.Rect(rect.x + shadow_offset, rect.y + shadow_offset, rect.width, rect.height)
-    shadow_surf = pygame.Surface((rect.width, rect.height), pygame.SRCALPHA)
-    pygame.draw.rect(shadow_surf, (0,0,0,70), shadow_surf.get_rect(), border_radius=8)
-    WIN.blit(shadow_surf, (shadow_rect.x, shadow_rect.y))
+    WIN.blit(effects.glow(rect.size, (0,0,0,70), 0, 8), (shadow_rect.x, shadow_rect.y))
 
     # Draw track (background)
     track_color = (40, 50, 70)
-    pygame.draw.rect(WIN, track_color, rect, border_radius=8)
+    WIN.draw_rect(track_color, rect, border_radius=8)
 
     # Draw filled portion (active volume)
     fill_color = (0, 200, 255)
     fill_rect = pygame.Rect(rect.x, rect.y, int(volume * rect.width), rect.height)
-    pygame.draw.rect(WIN, fill_color, fill_rect, border_radius=8)
+    WIN.draw_rect(fill_color, fill_rect, border_radius=8)
 
     # Draw border
-    pygame.draw.rect(WIN, (200,220,255), rect, width=2, border_radius=8)
+    WIN.draw_rect((200,220,255), rect, width=2, border_radius=8)
 
     # Draw thumb (handle) as a compact rounded rectangle with subtle border and shadow
     thumb_width = max(rect.height + 8, 22)
@@ -397,23 +761,17 @@ def draw_slider(rect, volume):
     thumb_x = int(rect.x + volume * rect.width - thumb_width // 2)
     thumb_y = rect.y + rect.height // 2 - thumb_height // 2
     # Thumb shadow (minimal)
-    thumb_shadow = pygame.Surface((thumb_width+4, thumb_height+4), pygame.SRCALPHA)
-    pygame.draw.rect(thumb_shadow, (0,0,0,60), (2,2,thumb_width,thumb_height), border_radius=thumb_height//2)
-    WIN.blit(thumb_shadow, (thumb_x, thumb_y))
-    # Thumb body
-    thumb_surf = pygame.Surface((thumb_width, thumb_height), pygame.SRCALPHA)
+    WIN.blit(effects.glow((thumb_width, thumb_height), (0,0,0,60), 4, thumb_height//2), (thumb_x, thumb_y))
+    # Thumb body with its border
     thumb_color = (220, 240, 255)
-    pygame.draw.rect(thumb_surf, thumb_color, thumb_surf.get_rect(), border_radius=thumb_height//2)
-    # Thumb border
-    pygame.draw.rect(thumb_surf, (0,200,255), thumb_surf.get_rect(), width=2, border_radius=thumb_height//2)
-    WIN.blit(thumb_surf, (thumb_x, thumb_y))
+    WIN.blit(effects.card((thumb_width, thumb_height), thumb_color, (0,200,255), thumb_height//2), (thumb_x, thumb_y))
     # Store the hitbox for the thumb for use in event handling (optional, for future use)
     global slider_thumb_hitbox
     slider_thumb_hitbox = pygame.Rect(thumb_x, thumb_y, thumb_width, thumb_height)
 
 def handle_slider_movement(rect, volume, mouse_x):
     # Allow dragging if mouse is on the track or within the thumb hitbox
-    mouse_y = pygame.mouse.get_pos()[1]
+    mouse_y = mouse_pos[1]
     thumb_width = max(rect.height + 8, 22)
     thumb_height = rect.height + 10
     thumb_x = int(rect.x + volume * rect.width - thumb_width // 2)
@@ -426,1324 +784,1247 @@ def handle_slider_movement(rect, volume, mouse_x):
 
 # Reset game
 def reset_game():
-    global player, bullets, enemies, score, health, enemy_speed, energy, level, enemy_spawn_time, high_score
-    global powerups, shield, shield_end_time, last_shot_time, last_dash_time, enemy_bullets, last_enemy_shoot_time
-    global arena_enemy_health, player_health, enemy_pieces, enemy_destroyed, enemy_destroy_start_time
-    global survival_enemy_pieces, survival_enemy_destroyed, survival_enemy_destroy_start_time
+    global player, last_shot_time, last_dash_time, last_enemy_shoot_time
+    global arena_enemy_health, player_health, enemy_destroyed, enemy_destroy_start_time
+    global survival_state, display_health
     global shield_animation_radius, shield_animation_growth, victory_music_playing
-    global enemy_target_x, enemy_target_y
+    global enemy_target_x, enemy_target_y, arena_previous
 
     player.x = WIDTH//2 - 25
     player.y = HEIGHT - 60
-    bullets = []
-    enemies = []
-    enemy_bullets = []
-    powerups = []
-    score = 0
-    health = max_health
-    enemy_speed = 2  # Keep initial speed slow
-    energy = max_energy
-    level = 1
-    enemy_spawn_time = 1000
-    shield = False
-    shield_end_time = 0
+    arena_previous = (player.topleft, arena_enemy.topleft)
+    bullets.clear()
+    enemy_bullets.clear()
     last_shot_time = 0
     last_dash_time = 0
     last_enemy_shoot_time = 0
     arena_enemy_health = arena_enemy_max_health
     player_health = player_max_health
-    enemy_pieces = []
+    arena_particles.clear()
     enemy_destroyed = False
     enemy_destroy_start_time = 0
-    survival_enemy_pieces = []
-    survival_enemy_destroyed = False
-    survival_enemy_destroy_start_time = 0
+    # Start a fresh Survival run, the high score carries over
+    survival_state = survival.new_state(seed=rng.getrandbits(32), high_score=survival_state.high_score)
+    sprint_trail.clear()
+    display_health = survival_state.health
     shield_animation_radius = 60
     shield_animation_growth = 2
     victory_music_playing = False
     enemy_target_x = WIDTH // 2
     enemy_target_y = 50
 
+def handle_survival_events(state):
+    # Turn what happened during the last survival step into sounds and effects
+    global game_state, health_blink_active, health_blink_start_time, splash_active, splash_start_time
+    for event_name in state.events:
+        if event_name == "shoot":
+            play_fx(sounds["shoot"], channel_fx_shoot, shoot_sound_volume)
+        elif event_name == "hit":
+            play_fx(sounds["hit"], channel_fx_hit, hit_sound_volume)
+        elif event_name == "powerup":
+            play_fx(sounds["powerup"], channel_fx_powerup, powerup_sound_volume)
+        elif event_name == "health_pickup":
+            health_blink_active = True  # Activate the blink effect
+            health_blink_start_time = game_clock.time
+            effect_timers.schedule(health_blink_start_time + health_blink_duration, end_health_blink, health_blink_start_time)
+        elif event_name == "clear_enemies":
+            splash_active = True  # Activate the splash effect
+            splash_start_time = game_clock.time
+            effect_timers.schedule(splash_start_time + splash_duration, end_splash, splash_start_time)
+        elif event_name == "game_over":
+            pygame.mixer.music.stop()
+            play_fx(sounds["game_over"], channel_fx_hit, hit_sound_volume)
+            game_state = "game_over"
+
+def end_health_blink(start_time):
+    # A blink started later keeps going
+    global health_blink_active
+    if health_blink_start_time == start_time:
+        health_blink_active = False
+
+def end_splash(start_time):
+    global splash_active
+    if splash_start_time == start_time:
+        splash_active = False
+
+POWERUP_COLORS = {
+    "health": GREEN,
+    "shield": BLUE,
+    "clear_enemies": YELLOW,
+    "double_gun": (0, 200, 255),  # Cyan for double gun
+    "triple_gun": (255, 100, 0),  # Orange for triple gun
+    "rapid_gun": (255, 0, 255),  # Magenta for rapid fire
+    "piercing_gun": (255, 255, 255),  # White for piercing
+}
 
-# Improved Survival Enemy AI – Smarter movement, dodging, and shooting
-def move_enemy(enemy):
-    # Simple vertical movement only, speed increases with level
-    vertical_speed = enemy_speed + (level - 1) * 0.4  # Increase speed more gradually per level
-    enemy.y += int(vertical_speed)
-    # Clamp position
-    enemy.y = max(-50, min(enemy.y, HEIGHT - enemy.height))
-
-# Power-up spawn logic
-def spawn_powerup():
-    # Add new gun upgrade power-ups
-    powerup_types = ["health", "shield", "clear_enemies", "double_gun", "triple_gun", "rapid_gun", "piercing_gun"]
-    powerup_type = random.choice(powerup_types)
-    powerup = {"type": powerup_type, "rect": pygame.Rect(random.randint(0, WIDTH-50), -50, 50, 50)}
-    powerups.append(powerup)
-
-def create_survival_enemy_pieces(enemy_rect, piece_size=10):
-    pieces = []
-    for i in range(enemy_rect.width // piece_size):
-        for j in range(enemy_rect.height // piece_size):
-            piece_rect = pygame.Rect(
-                enemy_rect.x + i * piece_size,
-                enemy_rect.y + j * piece_size,
-                piece_size,
-                piece_size
-            )
-            piece_velocity = [random.randint(-5, 5), random.randint(-5, 5)]  # Random velocity
-            pieces.append({"rect": piece_rect, "velocity": piece_velocity})
-    return pieces
-
-# Game loop
-running = True
-
-dragging_slider = None
-# Track if score has been saved for this game over session
-score_saved_this_gameover = False
-play_background_music()
-
-print(f"Music busy: {pygame.mixer.music.get_busy()}")  # Check if music is playing
-print(f"Music volume: {pygame.mixer.music.get_volume()}")  # Check the current volume
-
-while running:
-
-    # Reset the score_saved_this_gameover flag when not in game_over state
-    if game_state != "game_over":
-        score_saved_this_gameover = False
-
-    clock.tick(FPS)
-    WIN.fill(BLACK)
-    current_time = pygame.time.get_ticks()
-
-
-    # --- Scrollable help card state ---
-    if 'help_scroll_offset' not in globals():
-        help_scroll_offset = 0
-    help_scroll_step = 28  # pixels per scroll
-    help_max_scroll = 0  # will be set in help state
-
-    for event in pygame.event.get():
-        if event.type == pygame.QUIT:
-            running = False
-
-        if event.type == pygame.KEYDOWN:
-            if event.key == pygame.K_ESCAPE:
-                # Toggle pause for "play" and "arena" game states
-                if game_state in ["play", "arena"]:
-                    pause = not pause
-            # Scroll help card with up/down keys
-            if game_state == "help":
-                if event.key == pygame.K_DOWN:
-                    help_scroll_offset = min(help_scroll_offset + help_scroll_step, help_max_scroll)
-                elif event.key == pygame.K_UP:
-                    help_scroll_offset = max(help_scroll_offset - help_scroll_step, 0)
-
-        if event.type == pygame.MOUSEBUTTONDOWN:
-            mx, my = pygame.mouse.get_pos()
-
-            # Mouse wheel scroll for help card
-            if game_state == "help":
-                if event.button == 4:  # Scroll up
-                    help_scroll_offset = max(help_scroll_offset - help_scroll_step, 0)
-                elif event.button == 5:  # Scroll down
-                    help_scroll_offset = min(help_scroll_offset + help_scroll_step, help_max_scroll)
-
-            if game_state == "menu":
-                if not pause:  # Handle main menu buttons
-                    if BUTTONS["start"].collidepoint(mx, my):
-                        play_fx(click_sound, channel_fx_ui, click_sound_volume)
-                        pause = True  # Show game mode selection
-                    elif BUTTONS["leaderboard"].collidepoint(mx, my):
-                        play_fx(click_sound, channel_fx_ui, click_sound_volume)
-                        game_state = "leaderboard"
-                    elif BUTTONS["settings"].collidepoint(mx, my):
-                        play_fx(click_sound, channel_fx_ui, click_sound_volume)
-                        game_state = "settings"
-                    elif BUTTONS["help"].collidepoint(mx, my):
-                        play_fx(click_sound, channel_fx_ui, click_sound_volume)
-                        game_state = "help"
-                        help_scroll_offset = 0  # Reset scroll when opening help
-                    elif BUTTONS["exit"].collidepoint(mx, my):
-                        play_fx(click_sound, channel_fx_ui, click_sound_volume)
-                        pygame.quit()
-                        sys.exit()
-                else:  # Handle game mode selection buttons
-                    if BUTTONS["survival"].collidepoint(mx, my):
-                        play_fx(click_sound, channel_fx_ui, click_sound_volume)
-                        reset_game()
-                        get_ready_start_time = pygame.time.get_ticks()  # Start the "GET READY!" timer
-                        game_state = "get_ready_survival"  # Temporary state for Survival mode
-                    elif BUTTONS["arena"].collidepoint(mx, my):
-                        play_fx(click_sound, channel_fx_ui, click_sound_volume)
-                        reset_game()  # Reset all variables
-                        get_ready_start_time = pygame.time.get_ticks()  # Start the "GET READY!" timer
-                        game_state = "get_ready_arena"  # Temporary state for Arena mode
-                        pause = False  # Ensure the game is not paused
-                        print("Clicked on Arena button. Transitioning to 'get_ready_arena' state.")  # Debugging output
-                    elif BUTTONS["back"].collidepoint(mx, my):  # Handle "Back" button click
-                        play_fx(click_sound, channel_fx_ui, click_sound_volume)
-                        pause = False  # Return to the main menu
-
-            if pause:  # Handle "MENU" button in pause menu
-                if BUTTONS["menu_pause"].collidepoint(mx, my):
-                    play_fx(click_sound, channel_fx_ui, click_sound_volume)
-                    # Save score to leaderboard
-                    save_score(score)
-                    reset_game()
-                    pause = False  # Reset pause state
-                    game_state = "menu"
+def interpolated(rect, previous, back):
+    # rect as drawn `back` steps (0..1) behind its current position, previous is its top left one step ago
+    return rect.move(round((previous[0] - rect.x) * back), round((previous[1] - rect.y) * back))
 
-    # Handle the "GET READY!" state
-    if game_state == "get_ready_survival":
-        # Display the "GET READY!" text
-        get_ready_text = big_font.render("GET READY!", True, WHITE)
-        WIN.blit(get_ready_text, (WIDTH//2 - get_ready_text.get_width()//2, HEIGHT//2 - get_ready_text.get_height()//2))
-
-        # Transition to Survival mode after the delay
-        if current_time - get_ready_start_time > get_ready_duration:
-            game_state = "play"  # Transition to Survival mode
-            pause = False  # Ensure the game starts unpaused
-
-    elif game_state == "get_ready_arena":
-        # Display the "GET READY!" text
-        get_ready_text = big_font.render("GET READY!", True, WHITE)
-        WIN.blit(get_ready_text, (WIDTH//2 - get_ready_text.get_width()//2, HEIGHT//2 - get_ready_text.get_height()//2))
-
-        # Transition to Arena mode after the delay
-        if current_time - get_ready_start_time > get_ready_duration:
-            print("Transitioning to 'arena' state...")  # Debugging output
-            game_state = "arena"  # Transition to Arena mode
-            pause = False  # Ensure the game starts unpaused
-
-            # Stop any currently playing music
-            pygame.mixer.music.stop()
+def update_survival_effects(state):
+    # Effects that animate with the game, once per simulation step
+    global display_health, shield_animation_radius, shield_animation_growth
+    player = state.player
 
-            # Play arena music
-            pygame.mixer.music.load(arena_music)
-            pygame.mixer.music.set_volume(background_music_volume)  # Use the same volume setting
-            pygame.mixer.music.play(-1)  # Loop the arena music
-
-            # Initialize enemy target position to avoid errors
-            enemy_target_x = random.randint(0, WIDTH - arena_enemy.width)
-            enemy_target_y = random.randint(0, HEIGHT // 2 - arena_enemy.height)
-
-            # Reset player and enemy positions
-            player.x = WIDTH // 2 - player.width // 2
-            player.y = HEIGHT - player.height - 10
-            arena_enemy.x = WIDTH // 2 - arena_enemy.width // 2
-            arena_enemy.y = 50
-
-    elif game_state == "menu":
-        # Draw the background
-        WIN.blit(menu_background, (0, 0))
-
-
-
-        # Removed menu card background for a cleaner look
-
-        if not pause:  # Show the main menu buttons
-            draw_button("START", BUTTONS["start"], BLUE, alpha=180)
-            draw_button("LEADERBOARD", BUTTONS["leaderboard"], (0, 200, 255), alpha=180)
-            draw_button("SETTINGS", BUTTONS["settings"], BLUE, alpha=180)
-            draw_button("HELP", BUTTONS["help"], (100, 180, 255), alpha=180)
-            draw_button("EXIT", BUTTONS["exit"], RED, alpha=180)
-        else:  # Show the game mode selection buttons (same layout/size as main menu)
-            draw_button("SURVIVAL", BUTTONS["survival"], BLUE, alpha=180)
-            draw_button("ARENA", BUTTONS["arena"], BLUE, alpha=180)
-            draw_button("BACK", BUTTONS["back"], RED, alpha=180)
-    elif game_state == "leaderboard":
-        draw_leaderboard()
-        # Handle menu button (bottom center, matches settings screen)
-        if event.type == pygame.MOUSEBUTTONDOWN:
-            mx, my = pygame.mouse.get_pos()
-            if BUTTONS["menu_leaderboard"].collidepoint(mx, my):
-                play_fx(click_sound, channel_fx_ui, click_sound_volume)
-                game_state = "menu"
-
-    elif game_state == "help":
-        # Draw the menu background image (same as menu)
-        WIN.blit(menu_background, (0, 0))
-
-        # Card style for help screen
-        card_width, card_height = 540, 480
-        card_x = WIDTH // 2 - card_width // 2
-        card_y = HEIGHT // 2 - card_height // 2
-        shadow_offset = 10
-        # Drop shadow
-        shadow_surf = pygame.Surface((card_width, card_height), pygame.SRCALPHA)
-        pygame.draw.rect(shadow_surf, (0, 0, 0, 120), shadow_surf.get_rect(), border_radius=22)
-        WIN.blit(shadow_surf, (card_x + shadow_offset, card_y + shadow_offset))
-        # Card
-        card_surf = pygame.Surface((card_width, card_height), pygame.SRCALPHA)
-        pygame.draw.rect(card_surf, (30, 40, 60, 235), card_surf.get_rect(), border_radius=22)
-        pygame.draw.rect(card_surf, (30, 40, 60, 235), card_surf.get_rect(), width=2, border_radius=22)
-        WIN.blit(card_surf, (card_x, card_y))
-
-        # Title
-        help_title_font = pygame.font.SysFont("arial", 38, bold=True)
-        title = help_title_font.render("HELP & CONTROLS", True, (200,220,255))
-        WIN.blit(title, (WIDTH//2 - title.get_width()//2, card_y + 28))
-
-        # Help text with word wrapping
-        help_font = pygame.font.SysFont("arial", 22)
-        help_lines = [
-            "Controls:",
-            "  - Move: A/D (left/right), W/S (up/down in Arena)",
-            "  - Shoot: SPACEBAR",
-            "  - Sprint: Hold LSHIFT (Survival)",
-            "  - Dash: LSHIFT (Arena, with cooldown)",
-            "  - Pause: ESC",
-            "",
-            "Abilities & Power-ups:",
-            "  - Health: Restores 1 HP",
-            "  - Shield: Temporary invincibility",
-            "  - Clear Enemies: Destroys all enemies on screen",
-            "  - Double Gun: Shoot 2 bullets at once",
-            "  - Triple Gun: Shoot 3 bullets at once",
-            "  - Rapid Gun: Faster shooting",
-            "  - Piercing Gun: Bullets pass through enemies",
-            "",
-            "Survival Mode:",
-            "  - Survive waves, collect power-ups, defeat the boss!",
-            "",
-            "Arena Mode:",
-            "  - 1v1 duel, use dashes and upgrades to win!",
-            "",
-            "Press the MENU button below to return."
-        ]
-        y_start = card_y + 80
-        line_height = 28
-        # Word wrap helper
-        def wrap_text(text, font, max_width):
-            words = text.split(' ')
-            lines = []
-            current = ''
-            for word in words:
-                test = current + (' ' if current else '') + word
-                if font.size(test)[0] <= max_width:
-                    current = test
-                else:
-                    if current:
-                        lines.append(current)
-                    current = word
-            if current:
-                lines.append(current)
-            return lines if lines else ['']
-
-        # Prepare wrapped lines
-        text_area_padding_left = 36
-        text_area_padding_right = 36  # leave space for slider and some gap
-        text_area_width = card_width - text_area_padding_left - text_area_padding_right - 12  # 12px for slider
-        wrapped_lines = []
-        for line in help_lines:
-            if line.strip() == '':
-                wrapped_lines.append('')
-            else:
-                color = (220, 230, 255) if line.strip() else (200, 220, 255)
-                for wrapped in wrap_text(line, help_font, text_area_width):
-                    wrapped_lines.append((wrapped, color))
-
-        # Calculate total text height and max scroll
-        extra_bottom_space = 40  # Extra space at bottom so last text isn't blocked by button
-        total_text_height = len(wrapped_lines) * line_height + extra_bottom_space
-        visible_height = card_height - 120  # leave space for title and button
-        help_max_scroll = max(0, total_text_height - visible_height)
-        # Clip the text area to the card, leaving space for the vertical slider
-        text_clip_rect = pygame.Rect(card_x + text_area_padding_left, y_start, text_area_width, visible_height)
-        WIN.set_clip(text_clip_rect)
-        y = y_start - help_scroll_offset
-        for entry in wrapped_lines:
-            if entry == '':
-                y += line_height
-                continue
-            text, color = entry
-            # Only render if within visible area
-            if y + line_height > y_start and y < y_start + visible_height:
-                surf = help_font.render(text, True, color)
-                WIN.blit(surf, (card_x + text_area_padding_left, y))
-            y += line_height
-        WIN.set_clip(None)
-
-        # --- Vertical scroll bar ---
-        scrollbar_x = card_x + card_width - 24
-        scrollbar_y = y_start
-        scrollbar_width = 12
-        scrollbar_height = visible_height
-        # Draw scrollbar track
-        pygame.draw.rect(WIN, (60, 80, 120), (scrollbar_x, scrollbar_y, scrollbar_width, scrollbar_height), border_radius=6)
-        # Thumb size: proportional to visible/total
-        if total_text_height > 0:
-            thumb_height = max(40, int(visible_height * visible_height / total_text_height))
-        else:
-            thumb_height = visible_height
-        # Thumb position: proportional to scroll offset
-        if help_max_scroll > 0:
-            thumb_y = scrollbar_y + int((help_scroll_offset / help_max_scroll) * (scrollbar_height - thumb_height))
-        else:
-            thumb_y = scrollbar_y
-        thumb_rect = pygame.Rect(scrollbar_x, thumb_y, scrollbar_width, thumb_height)
-        # Draw thumb
-        pygame.draw.rect(WIN, (120, 180, 255), thumb_rect, border_radius=6)
-        # Draw thumb border
-        pygame.draw.rect(WIN, (200, 220, 255), thumb_rect, width=2, border_radius=6)
-
-        # Handle dragging the scrollbar thumb
-        if 'help_dragging_scrollbar' not in globals():
-            help_dragging_scrollbar = False
-        if 'help_drag_offset' not in globals():
-            help_drag_offset = 0
-
-        # Mouse events for scrollbar (handled in event loop)
-        if event.type == pygame.MOUSEBUTTONDOWN:
-            mx, my = pygame.mouse.get_pos()
-            if thumb_rect.collidepoint(mx, my):
-                help_dragging_scrollbar = True
-                help_drag_offset = my - thumb_y
-            elif pygame.Rect(scrollbar_x, scrollbar_y, scrollbar_width, scrollbar_height).collidepoint(mx, my):
-                # Click on track: jump thumb to mouse
-                rel_y = my - scrollbar_y - thumb_height // 2
-                rel_y = max(0, min(rel_y, scrollbar_height - thumb_height))
-                help_scroll_offset = int((rel_y / (scrollbar_height - thumb_height)) * help_max_scroll)
-        elif event.type == pygame.MOUSEBUTTONUP:
-            help_dragging_scrollbar = False
-        elif event.type == pygame.MOUSEMOTION and help_dragging_scrollbar:
-            mx, my = pygame.mouse.get_pos()
-            rel_y = my - scrollbar_y - help_drag_offset
-            rel_y = max(0, min(rel_y, scrollbar_height - thumb_height))
-            help_scroll_offset = int((rel_y / (scrollbar_height - thumb_height)) * help_max_scroll)
-            help_scroll_offset = max(0, min(help_scroll_offset, help_max_scroll))
-
-        # Draw the menu button at the bottom of the card
-        menu_btn_rect = pygame.Rect(WIDTH//2 - 55, card_y + card_height - 70, 110, 50)
-        draw_button("MENU", menu_btn_rect, BLUE)
-
-        # Handle menu button click
-        if event.type == pygame.MOUSEBUTTONDOWN:
-            mx, my = pygame.mouse.get_pos()
-            if menu_btn_rect.collidepoint(mx, my):
-                play_fx(click_sound, channel_fx_ui, click_sound_volume)
-                game_state = "menu"
-
-    elif game_state == "play":
-        if not pause:
-            keys = pygame.key.get_pressed()
-
-            # Sprint logic: hold LSHIFT to move faster while energy > 0
-            current_time = pygame.time.get_ticks()
-            sprinting = False
-            if keys[pygame.K_LSHIFT] and energy > 0:
-                sprinting = True
-                player_speed_actual = sprint_speed
-                energy -= energy_drain_rate
-                if energy <= 0:
-                    energy = 0
-                    energy_depleted_time = current_time
-            else:
-                player_speed_actual = player_speed
-
-            # Sprinting effect: store previous positions for trail
-            if 'sprint_trail' not in globals():
-                sprint_trail = []
-            if sprinting:
-                sprint_trail.append((player.x, player.y))
-                if len(sprint_trail) > 10:
-                    sprint_trail = sprint_trail[-10:]
-            else:
-                sprint_trail = []
-
-            # Energy only recharges after full depletion and cooldown (5s countdown, then instant refill)
-            if energy < max_energy:
-                if energy == 0:
-                    # Only refill after cooldown
-                    if current_time - energy_depleted_time >= energy_cooldown:
-                        energy = max_energy
-
-            # Restrict movement to left and right only (smooth), use sprint speed if sprinting
-            target_x = player_pos_x
-            if keys[pygame.K_a] and player.left > 0:
-                target_x -= player_speed_actual
-            if keys[pygame.K_d] and player.right < WIDTH:
-                target_x += player_speed_actual
-            # Smoothly interpolate player x
-            player_pos_x += (target_x - player_pos_x) * 0.4
-            # Ensure the player's y-position remains constant
-            player_pos_y = HEIGHT - 60
-            player.x = int(player_pos_x)
-            player.y = int(player_pos_y)
-
-            # Handle gun upgrade expiration (combinable)
-            now = pygame.time.get_ticks()
-            expired = [k for k, v in gun_upgrades.items() if now > v]
-            for k in expired:
-                del gun_upgrades[k]
-
-            # Handle shooting with combinable upgrades
-            if keys[pygame.K_SPACE]:
-                current_time = pygame.time.get_ticks()
-                upgrades = set(gun_upgrades.keys())
-                cooldown = rapid_fire_cooldown if 'rapid' in upgrades else shoot_cooldown
-                if current_time - last_shot_time >= cooldown:
-                    # Determine bullet pattern
-                    bullet_defs = []
-                    if 'triple' in upgrades:
-                        # Wider spread for triple shot (shotgun style)
-                        bullet_defs = [player.centerx - 30, player.centerx, player.centerx + 30]
-                    elif 'double' in upgrades:
-                        # Wider gap for double shot (shotgun style)
-                        bullet_defs = [player.centerx - 22, player.centerx + 22]
-                    else:
-                        bullet_defs = [player.centerx]
-                    for bx in bullet_defs:
-                        bullet = {'rect': pygame.Rect(bx, player.y, 10, 20), 'piercing': 'piercing' in upgrades}
-                        bullets.append(bullet)
-                    play_fx(shoot_sound, channel_fx_shoot, shoot_sound_volume)
-                    last_shot_time = current_time
-
-
-            # Remove off-screen bullets
-            for bullet in bullets[:]:
-                bullet['rect'].y -= bullet_speed
-                if bullet['rect'].bottom < 0:
-                    bullets.remove(bullet)
-
-
-            # Limit the number of bullets
-            if len(bullets) > 50:
-                bullets = bullets[-50:]
-
-
-            # Boss fight trigger
-            if not boss_active and score >= 100:
-                boss_active = True
-                boss = pygame.Rect(WIDTH//2 - 75, -150, 150, 100)
-                boss_health = boss_max_health
-                boss_bullets = []
-                # Pause normal enemy spawns
-                enemies.clear()
-                enemy_bullets.clear()
-
-            # Normal enemy spawn only if boss is not active
-            if not boss_active:
-                if current_time >= enemy_spawn_resume_time:  # Check if cooldown has elapsed
-                    if current_time - last_enemy_spawn > enemy_spawn_time:
-                        # Spawn only one enemy until level 20, then increase slowly
-                        spawn_count = 1
-                        if level >= 20:
-                            spawn_count = 2
-                        if level >= 40:
-                            spawn_count = 3
-                        for _ in range(spawn_count):
-                            enemy = pygame.Rect(random.randint(0, WIDTH-50), -50, 50, 50)
-                            enemies.append(enemy)
-                        last_enemy_spawn = current_time
-
-            # Enemy shooting logic removed for survival mode
-
-            if game_state == "play" and not pause:
-                # Move enemy bullets
-                for bullet in enemy_bullets[:]:
-                    bullet.y += enemy_bullet_speed
-                    if bullet.top > HEIGHT:  # Remove bullets that go off-screen
-                        enemy_bullets.remove(bullet)
-                    elif bullet.colliderect(player):  # Check collision with the player
-                        if not shield and not sprinting:  # If not shielded or sprinting, reduce health
-                            health -= 1
-                        enemy_bullets.remove(bullet)
-                        if health <= 0:
-                            pygame.mixer.music.stop()
-                            play_fx(game_over_sound, channel_fx_hit, hit_sound_volume)
-                            game_state = "game_over"
-
-                # Update enemies
-
-                for enemy in enemies[:]:
-                    move_enemy(enemy)
-                    # Remove enemy if it passes the bottom of the screen
-                    if enemy.top > HEIGHT:
-                        enemies.remove(enemy)
-                        continue
-                    # If shield is active, destroy only enemies overlapping the player
-                    if shield and enemy.colliderect(player):
-                        enemies.remove(enemy)
-                        score += 1
-                        play_fx(hit_sound, channel_fx_hit, hit_sound_volume)
-                        survival_explosions.append({
-                            "pieces": create_survival_enemy_pieces(enemy),
-                            "start_time": pygame.time.get_ticks()
-                        })
-                        continue
-                    if enemy.colliderect(player):
-                        if not shield and not sprinting:
-                            health -= 1
-                            if enemy in enemies:
-                                enemies.remove(enemy)
-                        elif sprinting:
-                            if enemy in enemies:
-                                enemies.remove(enemy)
-                        if health <= 0:
-                            pygame.mixer.music.stop()
-                            play_fx(game_over_sound, channel_fx_hit, hit_sound_volume)
-                            game_state = "game_over"
-                            break
-
-                    # Track if this enemy was hit by a bullet this frame
-                    hit_this_frame = False
-                    for bullet in bullets[:]:
-                        if enemy.colliderect(bullet['rect']):
-                            bullets.remove(bullet)
-                            if enemy in enemies:
-                                enemies.remove(enemy)
-                                score += 1
-                                play_fx(hit_sound, channel_fx_hit, hit_sound_volume)
-                                # Trigger destruction animation for this enemy
-                                survival_explosions.append({
-                                    "pieces": create_survival_enemy_pieces(enemy),
-                                    "start_time": pygame.time.get_ticks()
-                                })
-                                hit_this_frame = True
-                                break
-
-
-                # Animate all active enemy explosions
-                for explosion in survival_explosions[:]:
-                    elapsed_time = pygame.time.get_ticks() - explosion["start_time"]
-                    if elapsed_time < survival_enemy_destroy_duration:
-                        for piece in explosion["pieces"]:
-                            piece["rect"].x += piece["velocity"][0]
-                            piece["rect"].y += piece["velocity"][1]
-                            pygame.draw.rect(WIN, RED, piece["rect"])  # Draw each piece
-                    else:
-                        survival_explosions.remove(explosion)
-
-                # Deactivate shield after 5 seconds
-                if shield and pygame.time.get_ticks() > shield_end_time:
-                    shield = False
-
-                # Animate the shield
-                if shield:
-                    shield_animation_radius += shield_animation_growth
-                    if shield_animation_radius > 80 or shield_animation_radius < 60:  # Bounce between 60 and 80
-                        shield_animation_growth *= -1  # Reverse the growth direction
-
-                # Draw the shield animation
-                if shield:
-                    pygame.draw.circle(WIN, BLUE, player.center, shield_animation_radius, 2)  # Draw a glowing circle
-
-            # Draw enemy bullets
-            for bullet in enemy_bullets:
-                pygame.draw.rect(WIN, RED, bullet)
-
-
-
-            # Update enemies (skip if boss is active)
-            if not boss_active:
-                for enemy in enemies[:]:
-                    move_enemy(enemy)
-                    if enemy.colliderect(player):
-                        if not shield:
-                            health -= 1
-                            enemies.remove(enemy)
-                        if health <= 0:
-                            pygame.mixer.music.stop()
-                            play_fx(game_over_sound, channel_fx_hit, hit_sound_volume)
-                            game_state = "game_over"
-                            break
-
-                    for bullet in bullets[:]:
-                        if enemy.colliderect(bullet['rect']):
-                            if bullet['piercing']:
-                                enemies.remove(enemy)
-                                score += 1
-                                play_fx(hit_sound, channel_fx_hit, hit_sound_volume)
-                                # Do NOT remove bullet, allow it to keep going
-                                break
-                            else:
-                                bullets.remove(bullet)
-                                enemies.remove(enemy)
-                                score += 1
-                                play_fx(hit_sound, channel_fx_hit, hit_sound_volume)
-                                break
-
-            # Boss logic
-            if boss_active:
-                # Move boss into view
-                if boss.y < boss_entry_y:
-                    boss.y += 4
-                # Boss attacks
-                if pygame.time.get_ticks() - boss_last_attack > boss_attack_cooldown:
-                    # Fire a spread of bullets
-                    for dx in [-40, -20, 0, 20, 40]:
-                        boss_bullets.append({'rect': pygame.Rect(boss.centerx + dx - 5, boss.bottom, 10, 20), 'velocity': (dx//10, 8)})
-                    boss_last_attack = pygame.time.get_ticks()
-                # Move boss bullets
-                for b in boss_bullets[:]:
-                    b['rect'].x += b['velocity'][0]
-                    b['rect'].y += b['velocity'][1]
-                    if b['rect'].top > HEIGHT or b['rect'].left < 0 or b['rect'].right > WIDTH:
-                        boss_bullets.remove(b)
-                    elif b['rect'].colliderect(player):
-                        boss_bullets.remove(b)
-                        if not shield and not sprinting:
-                            health -= 2
-                        if health <= 0:
-                            pygame.mixer.music.stop()
-                            play_fx(game_over_sound, channel_fx_hit, hit_sound_volume)
-                            game_state = "game_over"
-                # Boss takes damage from player bullets
-                for bullet in bullets[:]:
-                    if boss.colliderect(bullet['rect']):
-                        boss_health -= 2 if bullet['piercing'] else 1
-                        if not bullet['piercing']:
-                            bullets.remove(bullet)
-                        play_fx(hit_sound, channel_fx_hit, hit_sound_volume)
-                        if boss_health <= 0:
-                            boss_active = False
-                            boss = None
-                            boss_bullets.clear()
-                            # Reward player
-                            score += 20
-                            break
-
-            # Limit the number of enemies
-            if len(enemies) > 20:
-                enemies = enemies[-20:]
-
-            if game_state == "play" and not pause:
-                # Spawn power-ups
-                if current_time - last_powerup_spawn > powerup_spawn_time:
-                    spawn_powerup()
-                    last_powerup_spawn = current_time
-
-
-                # Update power-ups
-                for powerup in powerups[:]:
-                    powerup["rect"].y += 5
-                    if powerup["rect"].top > HEIGHT:
-                        powerups.remove(powerup)
-                    elif powerup["rect"].colliderect(player):
-                        play_fx(powerup_sound, channel_fx_powerup, powerup_sound_volume)
-
-                        if powerup["type"] == "health":
-                            health = min(max_health, health + 1)  # Restore health
-                            health_blink_active = True  # Activate the blink effect
-                            health_blink_start_time = pygame.time.get_ticks()  # Record the start time
-                        elif powerup["type"] == "shield":
-                            shield = True  # Activate shield
-                            shield_end_time = pygame.time.get_ticks() + 5000  # Shield lasts for 5 seconds
-                        elif powerup["type"] == "clear_enemies":
-                            # Award points and trigger explosion for each enemy cleared
-                            for enemy in enemies[:]:
-                                score += 1
-                                play_fx(hit_sound, channel_fx_hit, hit_sound_volume)
-                                survival_explosions.append({
-                                    "pieces": create_survival_enemy_pieces(enemy),
-                                    "start_time": pygame.time.get_ticks()
-                                })
-                            enemies.clear()  # Clear all enemies from the screen
-                            enemy_bullets.clear()  # Clear all enemy bullets from the screen
-                            splash_active = True  # Activate the splash effect
-                            splash_start_time = pygame.time.get_ticks()  # Record the start time
-                            enemy_spawn_resume_time = pygame.time.get_ticks() + enemy_spawn_cooldown  # Set the cooldown timer
-                        elif powerup["type"] == "double_gun":
-                            gun_upgrades['double'] = pygame.time.get_ticks() + GUN_UPGRADE_DURATION
-                        elif powerup["type"] == "triple_gun":
-                            gun_upgrades['triple'] = pygame.time.get_ticks() + GUN_UPGRADE_DURATION
-                        elif powerup["type"] == "rapid_gun":
-                            gun_upgrades['rapid'] = pygame.time.get_ticks() + GUN_UPGRADE_DURATION
-                        elif powerup["type"] == "piercing_gun":
-                            gun_upgrades['piercing'] = pygame.time.get_ticks() + GUN_UPGRADE_DURATION
-
-                        powerups.remove(powerup)  # Remove the power-up after collection
-
-                # Draw the splash effect
-                if splash_active:
-                    elapsed_time = pygame.time.get_ticks() - splash_start_time
-                    if elapsed_time < splash_duration:
-                        # Draw a semi-transparent yellow overlay
-                        splash_surface = pygame.Surface((WIDTH, HEIGHT), pygame.SRCALPHA)
-                        splash_surface.fill((255, 255, 0, 128))  # Yellow with 50% transparency
-                        WIN.blit(splash_surface, (0, 0))
-                    else:
-                        splash_active = False  # Deactivate the splash effect after the duration
-
-                # Deactivate shield after 5 seconds
-                if shield and pygame.time.get_ticks() > shield_end_time:
-                    shield = False
-
-                # Animate the shield
-                if shield:
-                    shield_animation_radius += shield_animation_growth
-                    if shield_animation_radius > 80 or shield_animation_radius < 60:  # Bounce between 60 and 80
-                        shield_animation_growth *= -1  # Reverse the growth direction
-
-                # Draw power-ups
-                for powerup in powerups:
-                    if powerup["type"] == "health":
-                        pygame.draw.rect(WIN, GREEN, powerup["rect"])  # Health power-up
-                    elif powerup["type"] == "shield":
-                        pygame.draw.rect(WIN, BLUE, powerup["rect"])  # Shield power-up
-                    elif powerup["type"] == "clear_enemies":
-                        pygame.draw.rect(WIN, YELLOW, powerup["rect"])  # Clear enemies power-up
-
-            new_level = score // 10 + 1
-            if new_level > level:
-                level = new_level
-                enemy_speed += 0.2  # Increase speed more slowly per level
-                enemy_spawn_time = max(400, enemy_spawn_time - 20)  # Decrease spawn time more slowly
-
-            if score > high_score:
-                high_score = score
-
-        pygame.draw.rect(WIN, BLUE, player)
-
-        # Draw sprinting effect (trail and glow)
-        if 'sprint_trail' in globals() and sprint_trail:
-            for i, (tx, ty) in enumerate(sprint_trail):
-                alpha = int(80 * (1 - i / len(sprint_trail)))
-                trail_surf = pygame.Surface((player.width, player.height), pygame.SRCALPHA)
-                trail_surf.fill((0, 255, 0, alpha))
-                WIN.blit(trail_surf, (tx, ty))
-        if 'sprinting' in locals() and sprinting:
-            # Draw a green glow around the player
-            glow_size = 16
-            glow_surf = pygame.Surface((player.width + glow_size, player.height + glow_size), pygame.SRCALPHA)
-            pygame.draw.rect(glow_surf, (0, 255, 0, 120), (glow_size//2, glow_size//2, player.width, player.height), border_radius=8)
-            WIN.blit(glow_surf, (player.x - glow_size//2, player.y - glow_size//2))
-
-        # Draw the shield animation
-        if shield:
-            pygame.draw.circle(WIN, BLUE, player.center, shield_animation_radius, 2)  # Draw a glowing circle
-
-        # Draw smooth dash animation
-        if dash_animation_active:
-            elapsed_time = pygame.time.get_ticks() - dash_animation_start_time
-            t = min(1.0, elapsed_time / dash_animation_duration)
-            # Ease out: fast at first, slow at end
-            t_eased = 1 - (1 - t) * (1 - t)
-            outline_size = int(10 + (dash_animation_max_outline - 10) * (1 - t_eased))
-            outline_alpha = int(dash_animation_max_alpha * (1 - t_eased))
-            # Create a surface for alpha blending
-            dash_surf = pygame.Surface((player.width + outline_size * 2, player.height + outline_size * 2), pygame.SRCALPHA)
-            # Draw a glowing outline (yellow, fading out)
-            pygame.draw.rect(
-                dash_surf,
-                (255, 255, 0, outline_alpha),
-                pygame.Rect(outline_size//2, outline_size//2, player.width + outline_size, player.height + outline_size),
-                outline_size
-            )
-            WIN.blit(dash_surf, (player.x - outline_size//2, player.y - outline_size//2))
-            if elapsed_time >= dash_animation_duration:
-                dash_animation_active = False  # Deactivate the dash animation
-
-        # Draw health bar with smooth animation and blink
-        pygame.draw.rect(WIN, WHITE, (WIDTH//2 - 100, 10, 200, 20))  # Background of health bar
-        global display_health
-        try:
-            display_health
-        except NameError:
-            display_health = health
-        # Smoothly interpolate displayed health
-        display_health += (health - display_health) * 0.3
-        bar_width = (display_health / max_health) * 200
-        if health_blink_active:
-            elapsed_time = pygame.time.get_ticks() - health_blink_start_time
-            if elapsed_time < health_blink_duration:
-                if (elapsed_time // 100) % 2 == 0:
-                    pygame.draw.rect(WIN, RED, (WIDTH//2 - 100, 10, bar_width, 20))
-            else:
-                health_blink_active = False
-                pygame.draw.rect(WIN, RED, (WIDTH//2 - 100, 10, bar_width, 20))
-        else:
-            pygame.draw.rect(WIN, RED, (WIDTH//2 - 100, 10, bar_width, 20))
-
-        # Draw static energy bar under health bar
-        pygame.draw.rect(WIN, WHITE, (WIDTH//2 - 100, 35, 200, 20))  # Background of energy bar
-        energy_bar_width = (energy / max_energy) * 200
-        # Show cooldown visually: if energy is 0 and cooldown is active, fill bar gray with countdown
-        if energy == 0 and current_time - energy_depleted_time < energy_cooldown:
-            cooldown_elapsed = current_time - energy_depleted_time
-            cooldown_ratio = min(1.0, cooldown_elapsed / energy_cooldown)
-            cooldown_bar_width = int(200 * cooldown_ratio)
-            # Draw gray bar filling up to show countdown
-            pygame.draw.rect(WIN, (100, 100, 100), (WIDTH//2 - 100, 35, cooldown_bar_width, 20))
-        else:
-            pygame.draw.rect(WIN, (0, 255, 0), (WIDTH//2 - 100, 35, energy_bar_width, 20))  # Green energy bar
-        energy_label = font.render("Energy", True, WHITE)
-        WIN.blit(energy_label, (WIDTH//2 - 100, 60))
-
-        # Draw score and level
-        WIN.blit(font.render(f"Score: {score}", True, WHITE), (10, 10))
-        WIN.blit(font.render(f"Level: {level}", True, WHITE), (WIDTH - 150, 10))
-        WIN.blit(font.render(f"High Score: {high_score}", True, WHITE), (10, 40))
-
-
-        for bullet in bullets:
-            color = (0, 255, 255) if bullet['piercing'] else BLUE
-            pygame.draw.rect(WIN, color, bullet['rect'])
-
-        # Draw boss if active
-        if boss_active and boss:
-            pygame.draw.rect(WIN, (180, 0, 180), boss)
-            # Boss health bar
-            pygame.draw.rect(WIN, WHITE, (WIDTH//2 - 100, 70, 200, 20))
-            boss_bar_width = (boss_health / boss_max_health) * 200
-            pygame.draw.rect(WIN, (255, 0, 255), (WIDTH//2 - 100, 70, boss_bar_width, 20))
-            boss_label = font.render("BOSS", True, (255, 0, 255))
-            WIN.blit(boss_label, (WIDTH//2 - boss_label.get_width()//2, 45))
-            # Draw boss bullets
-            for b in boss_bullets:
-                pygame.draw.rect(WIN, (255, 100, 255), b['rect'])
-
-        for enemy in enemies:
-            pygame.draw.rect(WIN, RED, enemy)
-
-
-        for powerup in powerups:
-            if powerup["type"] == "health":
-                pygame.draw.rect(WIN, GREEN, powerup["rect"])  # Health power-up
-            elif powerup["type"] == "shield":
-                pygame.draw.rect(WIN, BLUE, powerup["rect"])  # Shield power-up
-            elif powerup["type"] == "clear_enemies":
-                pygame.draw.rect(WIN, YELLOW, powerup["rect"])  # Clear enemies power-up
-            elif powerup["type"] == "double_gun":
-                pygame.draw.rect(WIN, (0, 200, 255), powerup["rect"])  # Cyan for double gun
-            elif powerup["type"] == "triple_gun":
-                pygame.draw.rect(WIN, (255, 100, 0), powerup["rect"])  # Orange for triple gun
-            elif powerup["type"] == "rapid_gun":
-                pygame.draw.rect(WIN, (255, 0, 255), powerup["rect"])  # Magenta for rapid fire
-            elif powerup["type"] == "piercing_gun":
-                pygame.draw.rect(WIN, (255, 255, 255), powerup["rect"])  # White for piercing
-        # Draw current gun upgrade indicator
-        if gun_upgrades:
-            upgrade_names = []
-            if 'double' in gun_upgrades: upgrade_names.append('Double')
-            if 'triple' in gun_upgrades: upgrade_names.append('Triple')
-            if 'rapid' in gun_upgrades: upgrade_names.append('Rapid')
-            if 'piercing' in gun_upgrades: upgrade_names.append('Piercing')
-            if upgrade_names:
-                upgrade_label = font.render(f"Gun: {' + '.join(upgrade_names)}", True, (0,255,255))
-                WIN.blit(upgrade_label, (WIDTH//2 - upgrade_label.get_width()//2, 90))
-
-        if pause:
-            pause_text = big_font.render("PAUSED", True, WHITE)
-            WIN.blit(pause_text, (WIDTH//2 - pause_text.get_width()//2, HEIGHT//2 - 50))
-            
-            # Add a "MENU" button below the pause text
-            draw_button("MENU", BUTTONS["menu_pause"], BLUE)
-
-    elif game_state == "arena":
-        # Draw the player
-        pygame.draw.rect(WIN, BLUE, player)
-
-        # Draw the enemy or handle its destruction
-        if not enemy_destroyed:
-            pygame.draw.rect(WIN, RED, arena_enemy)  # Draw the enemy if not destroyed
+    # Animate the shield
+    if state.shield:
+        shield_animation_radius += shield_animation_growth
+        if shield_animation_radius > 80 or shield_animation_radius < 60:  # Bounce between 60 and 80
+            shield_animation_growth *= -1  # Reverse the growth direction
+
+    # Sprinting effect: store previous positions for trail
+    if state.sprinting:
+        sprint_trail.append((player.x, player.y))
+    else:
+        sprint_trail.clear()
+
+    # Smoothly interpolate displayed health
+    display_health += (state.health - display_health) * 0.3
+
+def draw_survival(state):
+    global dash_animation_active
+    back = 0 if pause else game_clock.back
+    player = interpolated(state.player, state.player_previous, back)
+    current_time = game_clock.time
+    effect_timers.run(current_time)
+
+    if not pause:
+        # Draw all active enemy explosions
+        profiling.lap("draw")
+        state.particles.draw(WIN, back)
+        profiling.lap("explosions")
+
+        # Draw the splash effect
+        if splash_active:
+            # Draw a semi-transparent yellow overlay
+            WIN.blit(effects.tint((WIDTH, HEIGHT), (255, 255, 0, 128)), (0, 0))  # Yellow with 50% transparency
+
+    WIN.draw_rect(BLUE, player)
+
+    # Draw sprinting effect (trail and glow)
+    for i, (tx, ty) in enumerate(sprint_trail):
+        alpha = int(80 * (1 - i / len(sprint_trail)))
+        WIN.blit(effects.tint(player.size, (0, 255, 0, alpha)), (tx, ty))
+    if state.sprinting:
+        # Draw a green glow around the player
+        glow_size = 16
+        WIN.blit(effects.glow(player.size, (0, 255, 0, 120), glow_size, 8), (player.x - glow_size//2, player.y - glow_size//2))
+
+    # Draw the shield animation
+    if state.shield:
+        WIN.draw_circle(BLUE, player.center, shield_animation_radius, 2)  # Draw a glowing circle
+
+    # Draw smooth dash animation
+    if dash_animation_active:
+        elapsed_time = current_time - dash_animation_start_time
+        t = min(1.0, elapsed_time / dash_animation_duration)
+        # Ease out: fast at first, slow at end
+        t_eased = 1 - (1 - t) * (1 - t)
+        outline_size = int(10 + (dash_animation_max_outline - 10) * (1 - t_eased))
+        outline_alpha = int(dash_animation_max_alpha * (1 - t_eased))
+        # Draw a glowing outline (yellow, fading out). Game time moves in whole
+        # steps, so the dash only ever shows a handful of sizes
+        WIN.blit(effects.outline(player.size, (255, 255, 0, outline_alpha), outline_size),
+                 (player.x - outline_size//2, player.y - outline_size//2))
+        if elapsed_time >= dash_animation_duration:
+            dash_animation_active = False  # Deactivate the dash animation
+
+    # Draw health bar with smooth animation and blink
+    profiling.lap("draw")
+    WIN.draw_rect(WHITE, (WIDTH//2 - 100, 10, 200, 20))  # Background of health bar
+    bar_width = (display_health / survival.max_health) * 200
+    if health_blink_active:
+        elapsed_time = current_time - health_blink_start_time
+        if (elapsed_time // 100) % 2 == 0:
+            WIN.draw_rect(RED, (WIDTH//2 - 100, 10, bar_width, 20))
+    else:
+        WIN.draw_rect(RED, (WIDTH//2 - 100, 10, bar_width, 20))
+
+    # Draw static energy bar under health bar
+    WIN.draw_rect(WHITE, (WIDTH//2 - 100, 35, 200, 20))  # Background of energy bar
+    energy_bar_width = (state.energy / survival.max_energy) * 200
+    # Show cooldown visually: if energy is 0 and cooldown is active, fill bar gray with countdown
+    cooldown_elapsed = state.time - state.energy_depleted_time
+    if state.energy == 0 and cooldown_elapsed < survival.energy_cooldown:
+        cooldown_ratio = min(1.0, cooldown_elapsed / survival.energy_cooldown)
+        cooldown_bar_width = int(200 * cooldown_ratio)
+        # Draw gray bar filling up to show countdown
+        WIN.draw_rect((100, 100, 100), (WIDTH//2 - 100, 35, cooldown_bar_width, 20))
+    else:
+        WIN.draw_rect((0, 255, 0), (WIDTH//2 - 100, 35, energy_bar_width, 20))  # Green energy bar
+    energy_label = render_text(font, "Energy", WHITE)
+    WIN.blit(energy_label, (WIDTH//2 - 100, 60))
+
+    # Draw score and level
+    draw_labeled_number("Score: ", state.score, font, WHITE, (10, 10))
+    draw_labeled_number("Level: ", state.level, font, WHITE, (WIDTH - 150, 10))
+    draw_labeled_number("High Score: ", state.high_score, font, WHITE, (10, 40))
+    profiling.lap("hud")
+
+    for rect, piercing in zip(state.bullets.rects(back), state.bullets.column("flag").tolist()):
+        color = (0, 255, 255) if piercing else BLUE
+        WIN.draw_rect(color, rect)
+
+    # Draw boss if active
+    if state.boss_active and state.boss:
+        WIN.draw_rect((180, 0, 180), interpolated(state.boss, state.boss_previous, back))
+        # Boss health bar
+        WIN.draw_rect(WHITE, (WIDTH//2 - 100, 70, 200, 20))
+        boss_bar_width = (state.boss_health / survival.boss_max_health) * 200
+        WIN.draw_rect((255, 0, 255), (WIDTH//2 - 100, 70, boss_bar_width, 20))
+        boss_label = render_text(font, "BOSS", (255, 0, 255))
+        WIN.blit(boss_label, (WIDTH//2 - boss_label.get_width()//2, 45))
+        # Draw boss bullets
+        for rect in state.boss_bullets.rects(back):
+            WIN.draw_rect((255, 100, 255), rect)
+
+    for enemy in state.enemies.rects(back):
+        WIN.draw_rect(RED, enemy)
+
+    for rect, kind in zip(state.powerups.rects(back), state.powerups.column("kind").tolist()):
+        WIN.draw_rect(POWERUP_COLORS[survival.POWERUP_TYPES[kind]], rect)
+
+    # Draw current gun upgrade indicator
+    profiling.lap("draw")
+    if state.gun_upgrades:
+        upgrade_names = []
+        if 'double' in state.gun_upgrades: upgrade_names.append('Double')
+        if 'triple' in state.gun_upgrades: upgrade_names.append('Triple')
+        if 'rapid' in state.gun_upgrades: upgrade_names.append('Rapid')
+        if 'piercing' in state.gun_upgrades: upgrade_names.append('Piercing')
+        upgrade_label = render_text(font, f"Gun: {' + '.join(upgrade_names)}", (0,255,255))
+        WIN.blit(upgrade_label, (WIDTH//2 - upgrade_label.get_width()//2, 90))
+
+    if pause:
+        pause_text = render_text(big_font, "PAUSED", WHITE)
+        WIN.blit(pause_text, (WIDTH//2 - pause_text.get_width()//2, HEIGHT//2 - 50))
+
+        # Add a "MENU" button below the pause text
+        draw_button("MENU", BUTTONS["menu_pause"], BLUE)
+    profiling.lap("hud")
+
+# Frame profiler: F3 shows how long each phase of the last frames took, and
+# --profile-csv streams the same numbers to a file. The phases are only timed
+# while one of them is on.
+PROFILER_KEY = pygame.K_F3
+PROFILER_PANEL = pygame.Rect(10, HEIGHT - 190, 300, 180)
+PROFILER_GRAPH_HEIGHT = 50
+PROFILER_GRAPH_MS = 33.3  # Top of the graph, two frames at 60 FPS
+FRAME_BUDGET_MS = 1000 / 60
+
+frame_profiler = profiling.FrameProfiler()
+show_profiler = False
+
+# Function profiles: F4 (or --profile-frames) runs cProfile and a stack
+# sampler over the next frames and writes a .pstats and a .collapsed file
+PROFILE_KEY = pygame.K_F4
+PROFILE_FRAMES = 300  # Frames F4 profiles when --profile-frames is not given
+
+frame_capture = None  # profiling.FrameCapture while frames are being profiled
+profile_captures = 0
+
+def start_frame_capture():
+    global frame_capture, profile_captures
+    if frame_capture is not None:
+        return  # Already profiling
+    profile_captures += 1
+    frame_capture = profiling.FrameCapture(args.profile_frames or PROFILE_FRAMES, f"{args.profile_output}-{profile_captures}")
+
+def finish_frame_capture():
+    global frame_capture
+    frames = frame_capture.finish()
+    log.info("Profile of %d frames written to %s.pstats and %s.collapsed", frames, frame_capture.path, frame_capture.path)
+    frame_capture = None
+
+def update_profiling():
+    # Time the phases while the overlay is up or samples go to a CSV file
+    profiling.active = frame_profiler if show_profiler or frame_profiler.csv_writer else None
+
+def count_entities():
+    # Live entities of the mode on screen, for the profiler
+    if game_state in ("arena", "get_ready_arena", "victory"):
+        frame_profiler.count(enemies=0 if enemy_destroyed else 1, bullets=len(bullets) + len(enemy_bullets),
+                             particles=len(arena_particles))
+    else:
+        state = survival_state
+        frame_profiler.count(enemies=len(state.enemies) + (1 if state.boss_active else 0),
+                             bullets=len(state.bullets) + len(state.boss_bullets), particles=len(state.particles))
+
+def draw_profiler_overlay():
+    # Smoothed time per phase in microseconds, entity counts and a graph of the recent frame times
+    panel = PROFILER_PANEL
+    WIN.blit(effects.tint(panel.size, (0, 0, 0, 170)), panel.topleft)
+    small_font = get_font("Arial", 16)
+    x, y = panel.x + 8, panel.y + 6
+    draw_labeled_number("frame us: ", frame_profiler.average_total * 1000, small_font, YELLOW, (x, y))
+    for i, phase in enumerate(profiling.PHASES):
+        column, row = i % 2, i // 2 + 1
+        draw_labeled_number(f"{phase}: ", frame_profiler.averages[phase] * 1000, small_font, WHITE, (x + column * 145, y + row * 18))
+    row = (len(profiling.PHASES) + 1) // 2 + 1
+    for i, name in enumerate(profiling.COUNTERS):
+        draw_labeled_number(f"{name}: ", frame_profiler.counters[name], small_font, (0, 255, 255), (x + i * 95, y + row * 18))
+    # Frame-time graph, the newest frame on the right, with a line at the 60 FPS budget
+    graph = pygame.Rect(x, panel.bottom - PROFILER_GRAPH_HEIGHT - 6, panel.width - 16, PROFILER_GRAPH_HEIGHT)
+    scale = graph.height / PROFILER_GRAPH_MS
+    WIN.draw_rect((90, 90, 90), (graph.x, graph.bottom - int(FRAME_BUDGET_MS * scale), graph.width, 1))
+    history = frame_profiler.history
+    if len(history) > 1:
+        step = graph.width / (history.maxlen - 1)
+        left = graph.right - (len(history) - 1) * step
+        points = [(left + i * step, graph.bottom - min(ms, PROFILER_GRAPH_MS) * scale) for i, ms in enumerate(history)]
+        WIN.draw_lines(GREEN, False, points)
+
+# Recording and replay
+def read_frame_input(real_dt):
+    # This frame's input: live from pygame, a benchmark script, or the next frame of a replay
+    if args.benchmark is not None:
+        return benchmark_frame_input()
+    if replay_player:
+        # The real window only matters for closing it, everything else comes from the file
+        quit_requested = any(event.type == pygame.QUIT for event in pygame.event.get())
+        frame_input = replay_player.read_frame()
+        if frame_input is None or quit_requested:
+            log.info("Replay finished after %d frames", replay_player.frame)
+            return replay.FrameInput(0, replay.KeyState(0), mouse_pos, [pygame.event.Event(pygame.QUIT)])
+        return frame_input
+    events = pygame.event.get()  # Pump events first so keys and mouse are up to date
+    keys = replay.KeyState.from_pressed(pygame.key.get_pressed())
+    return replay.FrameInput(real_dt, keys, pygame.mouse.get_pos(), events)
+
+def state_checksum():
+    # Cheap fingerprint of the game state, stored with every recorded frame
+    # so a replay can tell whether it still matches the original session
+    s = survival_state
+    values = (game_state, pause, game_clock.time, s.time, s.score, s.health, s.player.x, len(s.enemies), len(s.bullets),
+              player.x, player.y, arena_enemy.x, arena_enemy.y, arena_enemy_health, player_health)
+    return zlib.crc32(repr(values).encode())
+
+replay_diverged = False
+
+def check_frame_state(frame_input):
+    # Record the frame, or compare the replayed state with the recorded one.
+    # The checksum is taken before the frame runs, so even the frame that quits is covered.
+    global replay_diverged
+    if recorder:
+        recorder.write_frame(frame_input, state_checksum())
+    elif frame_input.checksum is not None and not replay_diverged:
+        if frame_input.checksum != state_checksum():
+            replay_diverged = True
+            log.warning("Replay diverged from the recording at frame %d", replay_player.frame)
+
+# --- Benchmark scenarios ---
+# Each scenario puts the game into a known heavy state and then runs a fixed number of
+# frames with scripted input, uncapped, while game time advances by a fixed 60 FPS step
+BENCHMARK_DT = SIM_DT
+
+def start_survival_scenario(level):
+    global game_state, pause
+    reset_game()
+    game_state = "play"
+    pause = False
+    state = survival_state
+    state.level = level
+    state.enemy_speed = 2 + 0.2 * (level - 1)
+    state.enemy_spawn_time = max(400, 1000 - 20 * (level - 1))
+    # A shield that never runs out keeps the player alive for the whole run
+    state.shield = True
+    state.shield_end_time = float("inf")
+    return state
+
+def autopilot_keys(frame):
+    inputs = survival.autopilot(survival_state)
+    keys = [pygame.K_SPACE] if inputs.shoot else []
+    if inputs.left:
+        keys.append(pygame.K_a)
+    if inputs.right:
+        keys.append(pygame.K_d)
+    return replay.KeyState.from_keys(*keys)
+
+def strafe_keys(frame):
+    # Shoot while sweeping left and right
+    return replay.KeyState.from_keys(pygame.K_SPACE, pygame.K_a if frame // 40 % 2 else pygame.K_d)
+
+def no_keys(frame):
+    return replay.KeyState(0)
+
+def setup_menu():
+    global game_state, pause
+    game_state = "menu"
+    pause = False
+
+def setup_help():
+    global game_state, help_scroll_offset
+    game_state = "help"
+    help_scroll_offset = 140  # Mid-scroll
+
+def setup_level40():
+    start_survival_scenario(level=40)  # Three enemies per spawn from level 40
+
+def setup_boss():
+    state = start_survival_scenario(level=11)
+    state.score = 100  # The boss arrives on the first step
+
+def setup_piercing():
+    state = start_survival_scenario(level=10)
+    for upgrade in ("triple", "rapid", "piercing"):
+        state.gun_upgrades[upgrade] = float("inf")
+
+def sustain_piercing():
+    # Keep the bullet list at its cap, spread over the screen
+    bullets = survival_state.bullets
+    while len(bullets) < survival.max_bullets:
+        i = len(bullets)
+        bullets.add(40 + i * 97 % 720, i * 53 % 560, 10, 20, vy=-survival.bullet_speed, flag=True)
+
+def setup_explosions():
+    start_survival_scenario(level=1)
+
+def sustain_explosions():
+    # A dozen enemy explosions on screen at all times
+    state = survival_state
+    while len(state.particles) < 12 * 25:
+        i = len(state.particles) // 25
+        state.particles.burst(60 + i * 60, 100 + i % 3 * 120, 50, 50, state.time, survival.survival_enemy_destroy_duration)
+
+def setup_arena():
+    global game_state, pause, enemy_target_x, enemy_target_y
+    reset_game()
+    game_state = "arena"
+    pause = False
+    player.x = WIDTH // 2 - player.width // 2
+    player.y = HEIGHT - player.height - 10
+    arena_enemy.x = WIDTH // 2 - arena_enemy.width // 2
+    arena_enemy.y = 50
+    enemy_target_x = rng.randint(0, WIDTH - arena_enemy.width)
+    enemy_target_y = rng.randint(0, HEIGHT // 2 - arena_enemy.height)
+
+def sustain_arena():
+    # Nobody wins, so the duel lasts for the whole run
+    global arena_enemy_health, player_health
+    arena_enemy_health = arena_enemy_max_health
+    player_health = player_max_health
+
+BENCHMARK_SCENARIOS = {
+    "menu": {"setup": setup_menu, "keys": no_keys, "mouse": (400, 210)},
+    "help_scroll": {"setup": setup_help, "keys": no_keys, "mouse": (400, 300)},
+    "survival_level40": {"setup": setup_level40, "keys": autopilot_keys},
+    "boss_spread": {"setup": setup_boss, "keys": strafe_keys},
+    "piercing_bullets": {"setup": setup_piercing, "keys": autopilot_keys, "sustain": sustain_piercing},
+    "explosions": {"setup": setup_explosions, "keys": no_keys, "sustain": sustain_explosions},
+    "arena_duel": {"setup": setup_arena, "keys": strafe_keys, "sustain": sustain_arena},
+}
+
+benchmark_queue = []  # Scenarios still to run, filled by main()
+benchmark_results = {}
+benchmark_current = None
+benchmark_frame = 0
+benchmark_times = None  # FrameTimes of the running scenario
+
+def benchmark_frame_input():
+    # Scripted input for the running scenario, moving on to the next one when it is done
+    global benchmark_current, benchmark_frame, benchmark_times
+    if any(event.type == pygame.QUIT for event in pygame.event.get()):
+        benchmark_queue.clear()
+        benchmark_current = None
+    if benchmark_current is None or benchmark_frame >= args.warmup + args.frames:
+        if benchmark_current is not None:
+            benchmark_results[benchmark_current] = benchmark_times.summary()
+        if not benchmark_queue:
+            benchmark_times = None
+            benchmark.write_report(benchmark.build_report(benchmark_results, args.frames, args.warmup, args.render_mode, args.surface_format), args.output)
+            return replay.FrameInput(0, replay.KeyState(0), mouse_pos, [pygame.event.Event(pygame.QUIT)])
+        benchmark_current = benchmark_queue.pop(0)
+        benchmark_frame = 0
+        benchmark_times = benchmark.FrameTimes()
+        BENCHMARK_SCENARIOS[benchmark_current]["setup"]()
+    scenario = BENCHMARK_SCENARIOS[benchmark_current]
+    if "sustain" in scenario:
+        scenario["sustain"]()
+    benchmark_frame += 1
+    position = scenario.get("mouse", (0, 0))
+    # Move the mouse into place on the first frame, after that only keys are scripted
+    events = [pygame.event.Event(pygame.MOUSEMOTION, pos=position)] if benchmark_frame == 1 else []
+    return replay.FrameInput(BENCHMARK_DT, scenario["keys"](benchmark_frame), position, events)
+
+def record_frame_time(update_time, render_time):
+    # Times in seconds, the report is in milliseconds
+    if benchmark_times is not None and benchmark_frame > args.warmup:
+        benchmark_times.add(update_time * 1000, render_time * 1000)
+
+def step_arena(keys, now):
+    # One fixed step of Arena mode, now is the game time of this step
+    global game_state, player_last_dodge, last_shot_time, arena_enemy_health, player_health
+    global enemy_target_x, enemy_target_y, last_enemy_shoot_time, enemy_destroyed, enemy_destroy_start_time
+    global arena_previous
+    arena_previous = (player.topleft, arena_enemy.topleft)
+    if enemy_destroyed:
+        # Animate enemy pieces
+        profiling.lap("update")
+        arena_particles.update(now)
+        profiling.lap("explosions")
+
+        # Check if the destruction effect duration has elapsed
+        elapsed_time = now - enemy_destroy_start_time
+        log.debug("Destruction animation running, elapsed %d ms", elapsed_time)
+        if elapsed_time > enemy_destroy_duration:
+            pygame.mixer.music.stop()  # Stop the arena music
+            game_state = "victory"  # Transition to victory state
+            log.debug("Transitioning to 'victory' state")
+
+    # Arena mode uses its own speed value
+    arena_player_speed = 7  # Set a reasonable speed for arena mode
+    if keys[pygame.K_a] and player.left > 0:
+        player.x -= arena_player_speed
+    if keys[pygame.K_d] and player.right < WIDTH:
+        player.x += arena_player_speed
+    if keys[pygame.K_w] and player.top > HEIGHT // 2:
+        player.y -= arena_player_speed
+    if keys[pygame.K_s] and player.bottom < HEIGHT:
+        player.y += arena_player_speed
+    if keys[pygame.K_LSHIFT] and now - player_last_dodge >= player_dodge_cooldown:
+        player_last_dodge = now
+        if keys[pygame.K_d] and player.right < WIDTH:
+            player.x += arena_player_speed * 4
+        if keys[pygame.K_a] and player.left > 0:
+            player.x -= arena_player_speed * 4
+
+    # Shooting logic (arena mode has no gun upgrades)
+    if keys[pygame.K_SPACE] and now - last_shot_time >= shoot_cooldown:
+        bullets.add(player.centerx - 5, player.y, 10, 20, vy=-bullet_speed)
+        play_fx(sounds["shoot"], channel_fx_shoot, shoot_sound_volume)
+        last_shot_time = now
+
+    # Move bullets and drop the ones that left the screen
+    profiling.lap("update")
+    if bullets:
+        bullets.move()
+        bullets.keep(bullets.column("y") + bullets.column("h") >= 0)
+        hits = bullets.overlapping(arena_enemy)
+        if len(hits):
+            arena_enemy_health -= len(hits)
+            play_fx(sounds["hit"], channel_fx_hit, hit_sound_volume)
+            # Piercing bullets keep going
+            bullets.remove(hits[bullets.column("flag")[hits] == 0])
+    profiling.lap("collision")
+
+    # Improved Arena Enemy AI
+    # 1. Smarter movement: track player, randomize target, and sometimes dash toward player
+    ai_retarget = False
+    if abs(arena_enemy.centerx - enemy_target_x) < 5 and abs(arena_enemy.centery - enemy_target_y) < 5:
+        ai_retarget = True
+    # Occasionally retarget even if not reached
+    if rng.random() < 0.01:
+        ai_retarget = True
+    if ai_retarget:
+        # 70% chance to target player, 30% random
+        if rng.random() < 0.7:
+            enemy_target_x = player.centerx + rng.randint(-30, 30)
+            enemy_target_y = player.centery - rng.randint(30, 80)
+            enemy_target_y = max(0, min(enemy_target_y, HEIGHT // 2 - arena_enemy.height))
         else:
-            # Animate enemy pieces
-            for piece in enemy_pieces:
-                piece["rect"].x += piece["velocity"][0]
-                piece["rect"].y += piece["velocity"][1]
-                pygame.draw.rect(WIN, RED, piece["rect"])  # Draw each piece
-
-            # Check if the destruction effect duration has elapsed
-            elapsed_time = pygame.time.get_ticks() - enemy_destroy_start_time
-            print(f"Destruction animation running... Elapsed time: {elapsed_time} ms")  # Debugging output
-            if elapsed_time > enemy_destroy_duration:
-                pygame.mixer.music.stop()  # Stop the arena music
-                game_state = "victory"  # Transition to victory state
-                print("Transitioning to 'victory' state...")  # Debugging output
-
-        # Draw health bars with labels
-        pygame.draw.rect(WIN, WHITE, (50, 10, 200, 20))  # Player health bar background
-        pygame.draw.rect(WIN, GREEN, (50, 10, (player_health / player_max_health) * 200, 20))  # Player health
-        player_label = font.render("Player", True, WHITE)
-        WIN.blit(player_label, (50, 35))  # Label above the player health bar
-
-        pygame.draw.rect(WIN, WHITE, (WIDTH - 250, 10, 200, 20))  # Enemy health bar background
-        pygame.draw.rect(WIN, GREEN, (WIDTH - 250, 10, (arena_enemy_health / arena_enemy_max_health) * 200, 20))  # Enemy health
-        enemy_label = font.render("Enemy", True, WHITE)
-        WIN.blit(enemy_label, (WIDTH - 250, 35))  # Label above the enemy health bar
-
-        if not pause:
-            # Arena mode uses its own speed value
-            arena_player_speed = 7  # Set a reasonable speed for arena mode
-            keys = pygame.key.get_pressed()
-            if keys[pygame.K_a] and player.left > 0:
-                player.x -= arena_player_speed
-            if keys[pygame.K_d] and player.right < WIDTH:
-                player.x += arena_player_speed
-            if keys[pygame.K_w] and player.top > HEIGHT // 2:
-                player.y -= arena_player_speed
-            if keys[pygame.K_s] and player.bottom < HEIGHT:
-                player.y += arena_player_speed
-            if keys[pygame.K_LSHIFT] and pygame.time.get_ticks() - player_last_dodge >= player_dodge_cooldown:
-                player_last_dodge = pygame.time.get_ticks()
-                if keys[pygame.K_d] and player.right < WIDTH:
-                    player.x += arena_player_speed * 4
-                if keys[pygame.K_a] and player.left > 0:
-                    player.x -= arena_player_speed * 4
-
-            # Handle gun upgrade expiration (combinable, arena mode)
-            now = pygame.time.get_ticks()
-            expired = [k for k, v in gun_upgrades.items() if now > v]
-            for k in expired:
-                del gun_upgrades[k]
-
-            # Shooting logic (combinable upgrades, arena mode)
-            if keys[pygame.K_SPACE]:
-                current_time = pygame.time.get_ticks()
-                upgrades = set(gun_upgrades.keys())
-                cooldown = rapid_fire_cooldown if 'rapid' in upgrades else shoot_cooldown
-                if current_time - last_shot_time >= cooldown:
-                    bullet_defs = []
-                    if 'triple' in upgrades:
-                        bullet_defs = [player.centerx - 15, player.centerx - 5, player.centerx + 5]
-                    elif 'double' in upgrades:
-                        bullet_defs = [player.centerx - 15, player.centerx + 5]
+            enemy_target_x = rng.randint(0, WIDTH - arena_enemy.width)
+            enemy_target_y = rng.randint(0, HEIGHT // 2 - arena_enemy.height)
+
+    # Move enemy toward the target position, with some jitter
+    move_x = enemy_target_x - arena_enemy.centerx
+    move_y = enemy_target_y - arena_enemy.centery
+    if abs(move_x) > 2:
+        arena_enemy.x += int(arena_enemy_speed * (1 if move_x > 0 else -1))
+    if abs(move_y) > 2:
+        arena_enemy.y += int(arena_enemy_speed * (1 if move_y > 0 else -1))
+    # Add jitter for unpredictability
+    if rng.random() < 0.05:
+        arena_enemy.x += rng.choice([-1, 1]) * rng.randint(0, 2)
+        arena_enemy.y += rng.choice([-1, 1]) * rng.randint(0, 2)
+    # Clamp enemy position
+    arena_enemy.x = max(0, min(arena_enemy.x, WIDTH - arena_enemy.width))
+    arena_enemy.y = max(0, min(arena_enemy.y, HEIGHT // 2 - arena_enemy.height))
+
+    # 2. Smarter dodging: dodge only if bullet is on a collision course and close
+    bullet_centers = (bullets.column("x") + bullets.column("w") // 2).tolist()
+    for bullet_y, bullet_centerx in zip(bullets.column("y").tolist(), bullet_centers):
+        if bullet_y < arena_enemy.bottom and bullet_y > arena_enemy.top - 100:
+            if abs(bullet_centerx - arena_enemy.centerx) < 40:
+                # 70% chance to dodge, prefer direction with more space
+                if rng.random() < 0.7:
+                    if arena_enemy.centerx < WIDTH // 2:
+                        # ...existing dodge logic...
+                        pass
                     else:
-                        bullet_defs = [player.centerx - 5]
-                    for bx in bullet_defs:
-                        try:
-                            bullet = {'rect': pygame.Rect(bx, player.y, 10, 20), 'piercing': 'piercing' in upgrades}
-                            bullets.append(bullet)
-                        except Exception as e:
-                            print(f"Error creating bullet in arena mode: {e}")
-                    play_fx(shoot_sound, channel_fx_shoot, shoot_sound_volume)
-                    last_shot_time = current_time
-
-            # Move bullets (arena mode, dict structure)
-            for bullet in bullets[:]:
-                try:
-                    bullet['rect'].y -= bullet_speed
-                    if bullet['rect'].bottom < 0:
-                        bullets.remove(bullet)
-                    elif bullet['rect'].colliderect(arena_enemy):
-                        if bullet.get('piercing', False):
-                            arena_enemy_health -= 1
-                            play_fx(hit_sound, channel_fx_hit, hit_sound_volume)
-                            # Do NOT remove bullet, allow it to keep going
-                        else:
-                            bullets.remove(bullet)
-                            arena_enemy_health -= 1
-                            play_fx(hit_sound, channel_fx_hit, hit_sound_volume)
-                except Exception as e:
-                    print(f"Error moving bullet in arena mode: {e}")
-
-
-            # Improved Arena Enemy AI
-            # 1. Smarter movement: track player, randomize target, and sometimes dash toward player
-            ai_retarget = False
-            if abs(arena_enemy.centerx - enemy_target_x) < 5 and abs(arena_enemy.centery - enemy_target_y) < 5:
-                ai_retarget = True
-            # Occasionally retarget even if not reached
-            if random.random() < 0.01:
-                ai_retarget = True
-            if ai_retarget:
-                # 70% chance to target player, 30% random
-                if random.random() < 0.7:
-                    enemy_target_x = player.centerx + random.randint(-30, 30)
-                    enemy_target_y = player.centery - random.randint(30, 80)
-                    enemy_target_y = max(0, min(enemy_target_y, HEIGHT // 2 - arena_enemy.height))
+                        # ...existing dodge logic...
+                        pass
                 else:
-                    enemy_target_x = random.randint(0, WIDTH - arena_enemy.width)
-                    enemy_target_y = random.randint(0, HEIGHT // 2 - arena_enemy.height)
-
-            # Move enemy toward the target position, with some jitter
-            move_x = enemy_target_x - arena_enemy.centerx
-            move_y = enemy_target_y - arena_enemy.centery
-            if abs(move_x) > 2:
-                arena_enemy.x += int(arena_enemy_speed * (1 if move_x > 0 else -1))
-            if abs(move_y) > 2:
-                arena_enemy.y += int(arena_enemy_speed * (1 if move_y > 0 else -1))
-            # Add jitter for unpredictability
-            if random.random() < 0.05:
-                arena_enemy.x += random.choice([-1, 1]) * random.randint(0, 2)
-                arena_enemy.y += random.choice([-1, 1]) * random.randint(0, 2)
-            # Clamp enemy position
-            arena_enemy.x = max(0, min(arena_enemy.x, WIDTH - arena_enemy.width))
-            arena_enemy.y = max(0, min(arena_enemy.y, HEIGHT // 2 - arena_enemy.height))
-
-            # 2. Smarter dodging: dodge only if bullet is on a collision course and close
-            for bullet in bullets:
-                bullet_y = bullet['rect'].y if 'rect' in bullet else getattr(bullet, 'y', 0)
-                bullet_centerx = bullet['rect'].centerx if 'rect' in bullet else getattr(bullet, 'centerx', 0)
-                if bullet_y < arena_enemy.bottom and bullet_y > arena_enemy.top - 100:
-                    if abs(bullet_centerx - arena_enemy.centerx) < 40:
-                        # 70% chance to dodge, prefer direction with more space
-                        if random.random() < 0.7:
-                            if arena_enemy.centerx < WIDTH // 2:
-                                # ...existing dodge logic...
-                                pass
-                            else:
-                                # ...existing dodge logic...
-                                pass
-                        else:
-                            # Random dodge
-                            arena_enemy.x += random.choice([-1, 1]) * arena_enemy_speed * 6
-                        # Clamp after dodge
-                        arena_enemy.x = max(0, min(arena_enemy.x, WIDTH - arena_enemy.width))
-
-            # 3. Aggressive dash: sometimes dash toward player if far away
-            if random.random() < 0.01 and abs(arena_enemy.centerx - player.centerx) > 100:
-                dash_dir = 1 if player.centerx > arena_enemy.centerx else -1
-                arena_enemy.x += dash_dir * arena_enemy_speed * 10
+                    # Random dodge
+                    arena_enemy.x += rng.choice([-1, 1]) * arena_enemy_speed * 6
+                # Clamp after dodge
                 arena_enemy.x = max(0, min(arena_enemy.x, WIDTH - arena_enemy.width))
 
-            # 4. Predictive shooting: aim at player's future position with more accuracy
-            # (handled below in the shooting logic)
+    # 3. Aggressive dash: sometimes dash toward player if far away
+    if rng.random() < 0.01 and abs(arena_enemy.centerx - player.centerx) > 100:
+        dash_dir = 1 if player.centerx > arena_enemy.centerx else -1
+        arena_enemy.x += dash_dir * arena_enemy_speed * 10
+        arena_enemy.x = max(0, min(arena_enemy.x, WIDTH - arena_enemy.width))
+
+    # 4. Predictive shooting: aim at player's future position with more accuracy
+    # (handled below in the shooting logic)
+
+    # Predictive shooting logic and bullet movement only if enemy is not destroyed
+    current_time = now
+    if not enemy_destroyed:
+        if current_time - last_enemy_shoot_time > enemy_shoot_cooldown:
+            # Predict the player's future position
+            player_future_x = player.centerx + (player_speed if keys[pygame.K_d] else -player_speed if keys[pygame.K_a] else 0)
+            player_future_y = player.centery + (player_speed if keys[pygame.K_s] else -player_speed if keys[pygame.K_w] else 0)
+
+            # Create a bullet aimed at the predicted position
+            bullet_dx = player_future_x - arena_enemy.centerx
+            bullet_dy = player_future_y - arena_enemy.centery
+            bullet_distance = max(1, (bullet_dx**2 + bullet_dy**2)**0.5)  # Avoid division by zero
+            bullet_velocity_x = (bullet_dx / bullet_distance) * enemy_bullet_speed
+            bullet_velocity_y = (bullet_dy / bullet_distance) * enemy_bullet_speed
+
+            # Add the bullet with velocity, in whole pixels per step
+            enemy_bullets.add(arena_enemy.centerx - 5, arena_enemy.bottom, 10, 20,
+                              vx=round(bullet_velocity_x), vy=round(bullet_velocity_y))
+
+            last_enemy_shoot_time = current_time
+
+        # Move enemy bullets and remove the ones that go off-screen
+        profiling.lap("update")
+        if enemy_bullets:
+            enemy_bullets.move()
+            x, y = enemy_bullets.column("x"), enemy_bullets.column("y")
+            enemy_bullets.keep((y <= HEIGHT) & (y + enemy_bullets.column("h") >= 0) & (x <= WIDTH) & (x + enemy_bullets.column("w") >= 0))
+            hits = enemy_bullets.overlapping(player)
+            if len(hits):
+                enemy_bullets.remove(hits)
+                player_health -= len(hits)
+                play_fx(sounds["hit"], channel_fx_hit, hit_sound_volume)
+        profiling.lap("collision")
+    else:
+        # If enemy is destroyed, clear all enemy bullets
+        enemy_bullets.clear()
+
+    # Check for game over or victory
+    if enemy_destroyed:
+        log.debug("Animating %d enemy pieces", len(arena_particles))
+
+    if arena_enemy_health <= 0 and not enemy_destroyed:
+        log.debug("Enemy health is 0, triggering destruction effect")
+        enemy_destroyed = True
+        enemy_destroy_start_time = now  # Start the destruction timer
+
+        # Create enemy pieces
+        arena_particles.burst(arena_enemy.x, arena_enemy.y, arena_enemy.width, arena_enemy.height,
+                              now, enemy_destroy_duration)
+
+        log.debug("Created %d enemy pieces for destruction animation", len(arena_particles))
+
+    elif player_health <= 0:
+        pygame.mixer.music.stop()  # Stop the arena music
+        play_fx(sounds["game_over"], channel_fx_hit, hit_sound_volume)
+        game_state = "game_over"
+    profiling.lap("update")
+
+def run():
+    # The game loop, until the window is closed
+    global game_state, pause, mouse_pos, get_ready_start_time, enemy_target_x, enemy_target_y, victory_music_playing
+    global background_music_volume, shoot_sound_volume, hit_sound_volume
+    global slider_x, slider_music_rect, slider_shoot_rect, slider_hit_rect
+    global help_scroll_offset, help_dragging_scrollbar, help_drag_offset
+    global show_profiler
+    running = True
+
+    dragging_slider = None
+    play_background_music()
+
+    log.debug("Music busy: %s, volume: %s", pygame.mixer.music.get_busy(), pygame.mixer.music.get_volume())
+
+    while running:
+
+        if args.fast or args.benchmark is not None:
+            real_dt = clock.tick()
+        elif replay_player:
+            # A replay keeps the recorded pace: each frame waits for its recorded dt
+            recorded_dt = replay_player.next_dt()
+            real_dt = clock.tick(1000 / recorded_dt) if recorded_dt else clock.tick()
+        else:
+            real_dt = clock.tick(args.render_fps)
+        real_dt = min(real_dt, replay.MAX_DT)  # Played and recorded alike, so a replay sees what the session saw
+        profiler = profiling.active  # Phases are timed from here, after waiting for the frame
+        if profiler:
+            profiler.begin()
+        capture = frame_capture
+        if capture:
+            capture.begin_frame()
+        frame_input = read_frame_input(real_dt)
+        dt = frame_input.dt  # Milliseconds since the last frame
+        game_clock.tick(dt)
+        mouse_pos = frame_input.mouse_pos
+        check_frame_state(frame_input)
+        profiling.lap("input")
+        fill_start = time.perf_counter()
+        WIN.clear()
+        profiling.lap("draw")
+        frame_start = time.perf_counter()
+        fill_time = frame_start - fill_start  # Counted as render time
+        current_time = game_clock.time
+
+
+        # --- Scrollable help card state ---
+        if 'help_scroll_offset' not in globals():
+            help_scroll_offset = 0
+        help_scroll_step = 28  # pixels per scroll
+        help_max_scroll = 0  # will be set in help state
+
+        for event in frame_input.events:
+            if event.type == pygame.QUIT:
+                running = False
+
+            if event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_ESCAPE:
+                    # Toggle pause for "play" and "arena" game states
+                    if game_state in ["play", "arena"]:
+                        pause = not pause
+                # Time controls: cycle normal / slow motion / fast-forward, freeze
+                if event.key == pygame.K_F6:
+                    game_clock.next_time_scale()
+                elif event.key == pygame.K_F7:
+                    game_clock.toggle_paused()
+                elif event.key == PROFILER_KEY:
+                    show_profiler = not show_profiler
+                    update_profiling()
+                elif event.key == PROFILE_KEY:
+                    start_frame_capture()
+                # Scroll help card with up/down keys
+                if game_state == "help":
+                    if event.key == pygame.K_DOWN:
+                        help_scroll_offset = min(help_scroll_offset + help_scroll_step, help_max_scroll)
+                    elif event.key == pygame.K_UP:
+                        help_scroll_offset = max(help_scroll_offset - help_scroll_step, 0)
 
-            # Predictive shooting logic and bullet movement only if enemy is not destroyed
-            current_time = pygame.time.get_ticks()
+            if event.type == pygame.MOUSEBUTTONDOWN:
+                mx, my = mouse_pos
+
+                # Mouse wheel scroll for help card
+                if game_state == "help":
+                    if event.button == 4:  # Scroll up
+                        help_scroll_offset = max(help_scroll_offset - help_scroll_step, 0)
+                    elif event.button == 5:  # Scroll down
+                        help_scroll_offset = min(help_scroll_offset + help_scroll_step, help_max_scroll)
+
+                if game_state == "menu":
+                    if not pause:  # Handle main menu buttons
+                        if BUTTONS["start"].collidepoint(mx, my):
+                            play_fx(sounds["click"], channel_fx_ui, click_sound_volume)
+                            pause = True  # Show game mode selection
+                        elif BUTTONS["leaderboard"].collidepoint(mx, my):
+                            play_fx(sounds["click"], channel_fx_ui, click_sound_volume)
+                            game_state = "leaderboard"
+                        elif BUTTONS["settings"].collidepoint(mx, my):
+                            play_fx(sounds["click"], channel_fx_ui, click_sound_volume)
+                            game_state = "settings"
+                        elif BUTTONS["help"].collidepoint(mx, my):
+                            play_fx(sounds["click"], channel_fx_ui, click_sound_volume)
+                            game_state = "help"
+                            help_scroll_offset = 0  # Reset scroll when opening help
+                        elif BUTTONS["exit"].collidepoint(mx, my):
+                            play_fx(sounds["click"], channel_fx_ui, click_sound_volume)
+                            running = False  # main() shuts down, writing an unfinished profile first
+                    else:  # Handle game mode selection buttons
+                        if BUTTONS["survival"].collidepoint(mx, my):
+                            play_fx(sounds["click"], channel_fx_ui, click_sound_volume)
+                            reset_game()
+                            get_ready_start_time = game_clock.time  # Start the "GET READY!" timer
+                            game_state = "get_ready_survival"  # Temporary state for Survival mode
+                        elif BUTTONS["arena"].collidepoint(mx, my):
+                            play_fx(sounds["click"], channel_fx_ui, click_sound_volume)
+                            reset_game()  # Reset all variables
+                            get_ready_start_time = game_clock.time  # Start the "GET READY!" timer
+                            game_state = "get_ready_arena"  # Temporary state for Arena mode
+                            pause = False  # Ensure the game is not paused
+                            log.debug("Clicked on Arena button, transitioning to 'get_ready_arena' state")
+                        elif BUTTONS["back"].collidepoint(mx, my):  # Handle "Back" button click
+                            play_fx(sounds["click"], channel_fx_ui, click_sound_volume)
+                            pause = False  # Return to the main menu
+
+                if pause:  # Handle "MENU" button in pause menu
+                    if BUTTONS["menu_pause"].collidepoint(mx, my):
+                        play_fx(sounds["click"], channel_fx_ui, click_sound_volume)
+                        # Save score to leaderboard
+                        save_score(survival_state.score)
+                        reset_game()
+                        pause = False  # Reset pause state
+                        game_state = "menu"
+
+        # Menus only update while handling events, Survival and Arena mark the end of their update below
+        update_end = time.perf_counter()
+        profiling.lap("events")
+
+        # Menus set their own background, everything else is drawn over the blank one
+        if game_state not in MENU_STATES:
+            WIN.set_background()
+
+        # Handle the "GET READY!" state
+        if game_state == "get_ready_survival":
+            # Display the "GET READY!" text
+            get_ready_text = render_text(big_font, "GET READY!", WHITE)
+            WIN.blit(get_ready_text, (WIDTH//2 - get_ready_text.get_width()//2, HEIGHT//2 - get_ready_text.get_height()//2))
+
+            # Transition to Survival mode after the delay
+            if current_time - get_ready_start_time > get_ready_duration:
+                game_state = "play"  # Transition to Survival mode
+                pause = False  # Ensure the game starts unpaused
+
+        elif game_state == "get_ready_arena":
+            # Display the "GET READY!" text
+            get_ready_text = render_text(big_font, "GET READY!", WHITE)
+            WIN.blit(get_ready_text, (WIDTH//2 - get_ready_text.get_width()//2, HEIGHT//2 - get_ready_text.get_height()//2))
+
+            # Transition to Arena mode after the delay
+            if current_time - get_ready_start_time > get_ready_duration:
+                log.debug("Transitioning to 'arena' state")
+                game_state = "arena"  # Transition to Arena mode
+                pause = False  # Ensure the game starts unpaused
+
+                # Stop any currently playing music
+                pygame.mixer.music.stop()
+
+                # Play arena music
+                load_music("arena")
+                pygame.mixer.music.set_volume(background_music_volume)  # Use the same volume setting
+                pygame.mixer.music.play(-1)  # Loop the arena music
+
+                # Initialize enemy target position to avoid errors
+                enemy_target_x = rng.randint(0, WIDTH - arena_enemy.width)
+                enemy_target_y = rng.randint(0, HEIGHT // 2 - arena_enemy.height)
+
+                # Reset player and enemy positions
+                player.x = WIDTH // 2 - player.width // 2
+                player.y = HEIGHT - player.height - 10
+                arena_enemy.x = WIDTH // 2 - arena_enemy.width // 2
+                arena_enemy.y = 50
+
+        elif game_state == "menu":
+            # Draw the background
+            WIN.set_background(get_menu_background())
+
+
+
+            # Removed menu card background for a cleaner look
+
+            if not pause:  # Show the main menu buttons
+                draw_button("START", BUTTONS["start"], BLUE, alpha=180)
+                draw_button("LEADERBOARD", BUTTONS["leaderboard"], (0, 200, 255), alpha=180)
+                draw_button("SETTINGS", BUTTONS["settings"], BLUE, alpha=180)
+                draw_button("HELP", BUTTONS["help"], (100, 180, 255), alpha=180)
+                draw_button("EXIT", BUTTONS["exit"], RED, alpha=180)
+            else:  # Show the game mode selection buttons (same layout/size as main menu)
+                draw_button("SURVIVAL", BUTTONS["survival"], BLUE, alpha=180)
+                draw_button("ARENA", BUTTONS["arena"], BLUE, alpha=180)
+                draw_button("BACK", BUTTONS["back"], RED, alpha=180)
+        elif game_state == "leaderboard":
+            draw_leaderboard()
+            # Handle menu button (bottom center, matches settings screen)
+            if event.type == pygame.MOUSEBUTTONDOWN:
+                mx, my = mouse_pos
+                if BUTTONS["menu_leaderboard"].collidepoint(mx, my):
+                    play_fx(sounds["click"], channel_fx_ui, click_sound_volume)
+                    game_state = "menu"
+
+        elif game_state == "help":
+            # Menu background, card and title
+            draw_card_layer("help", render_help_layer)
+            card_x, card_y, card_width, card_height = HELP_CARD
+
+            # Help text, wrapped and rendered once (see get_help_text)
+            help_font = get_font("arial", 22)
+            y_start = card_y + 80
+            line_height = 28
+            text_area_padding_left = 36
+            text_area_padding_right = 36  # leave space for slider and some gap
+            text_area_width = card_width - text_area_padding_left - text_area_padding_right - 12  # 12px for slider
+            help_text = get_help_text(help_font, text_area_width, line_height)
+
+            # Calculate total text height and max scroll
+            extra_bottom_space = 40  # Extra space at bottom so last text isn't blocked by button
+            total_text_height = help_text.get_height() + extra_bottom_space
+            visible_height = card_height - 120  # leave space for title and button
+            help_max_scroll = max(0, total_text_height - visible_height)
+            # The visible part of the text, inside the card and clear of the vertical slider
+            WIN.blit(help_text, (card_x + text_area_padding_left, y_start), (0, help_scroll_offset, text_area_width, visible_height))
+
+            # --- Vertical scroll bar ---
+            scrollbar_x = card_x + card_width - 24
+            scrollbar_y = y_start
+            scrollbar_width = 12
+            scrollbar_height = visible_height
+            # Draw scrollbar track
+            WIN.draw_rect((60, 80, 120), (scrollbar_x, scrollbar_y, scrollbar_width, scrollbar_height), border_radius=6)
+            # Thumb size: proportional to visible/total
+            if total_text_height > 0:
+                thumb_height = max(40, int(visible_height * visible_height / total_text_height))
+            else:
+                thumb_height = visible_height
+            # Thumb position: proportional to scroll offset
+            if help_max_scroll > 0:
+                thumb_y = scrollbar_y + int((help_scroll_offset / help_max_scroll) * (scrollbar_height - thumb_height))
+            else:
+                thumb_y = scrollbar_y
+            thumb_rect = pygame.Rect(scrollbar_x, thumb_y, scrollbar_width, thumb_height)
+            # Draw thumb
+            WIN.draw_rect((120, 180, 255), thumb_rect, border_radius=6)
+            # Draw thumb border
+            WIN.draw_rect((200, 220, 255), thumb_rect, width=2, border_radius=6)
+
+            # Handle dragging the scrollbar thumb
+            if 'help_dragging_scrollbar' not in globals():
+                help_dragging_scrollbar = False
+            if 'help_drag_offset' not in globals():
+                help_drag_offset = 0
+
+            # Mouse events for scrollbar (handled in event loop)
+            if event.type == pygame.MOUSEBUTTONDOWN:
+                mx, my = mouse_pos
+                if thumb_rect.collidepoint(mx, my):
+                    help_dragging_scrollbar = True
+                    help_drag_offset = my - thumb_y
+                elif pygame.Rect(scrollbar_x, scrollbar_y, scrollbar_width, scrollbar_height).collidepoint(mx, my):
+                    # Click on track: jump thumb to mouse
+                    rel_y = my - scrollbar_y - thumb_height // 2
+                    rel_y = max(0, min(rel_y, scrollbar_height - thumb_height))
+                    help_scroll_offset = int((rel_y / (scrollbar_height - thumb_height)) * help_max_scroll)
+            elif event.type == pygame.MOUSEBUTTONUP:
+                help_dragging_scrollbar = False
+            elif event.type == pygame.MOUSEMOTION and help_dragging_scrollbar:
+                mx, my = mouse_pos
+                rel_y = my - scrollbar_y - help_drag_offset
+                rel_y = max(0, min(rel_y, scrollbar_height - thumb_height))
+                help_scroll_offset = int((rel_y / (scrollbar_height - thumb_height)) * help_max_scroll)
+                help_scroll_offset = max(0, min(help_scroll_offset, help_max_scroll))
+
+            # Draw the menu button at the bottom of the card
+            menu_btn_rect = pygame.Rect(WIDTH//2 - 55, card_y + card_height - 70, 110, 50)
+            draw_button("MENU", menu_btn_rect, BLUE)
+
+            # Handle menu button click
+            if event.type == pygame.MOUSEBUTTONDOWN:
+                mx, my = mouse_pos
+                if menu_btn_rect.collidepoint(mx, my):
+                    play_fx(sounds["click"], channel_fx_ui, click_sound_volume)
+                    game_state = "menu"
+
+        elif game_state == "play":
+            if not pause:
+                keys = frame_input.keys
+                inputs = survival.Inputs(keys[pygame.K_a], keys[pygame.K_d], keys[pygame.K_SPACE], keys[pygame.K_LSHIFT])
+                for step in range(game_clock.steps):
+                    survival.step(survival_state, inputs, SIM_DT)
+                    handle_survival_events(survival_state)
+                    update_survival_effects(survival_state)
+            update_end = time.perf_counter()
+            profiling.lap("update")
+            draw_survival(survival_state)
+
+        elif game_state == "arena":
+            if not pause:
+                keys = frame_input.keys
+                for step in range(game_clock.steps):
+                    step_arena(keys, game_clock.step_time(step))
+                    if game_state != "arena":
+                        break
+            update_end = time.perf_counter()
+
+            # Draw the player, positions are interpolated between the last two steps
+            back = 0 if pause else game_clock.back
+            WIN.draw_rect(BLUE, interpolated(player, arena_previous[0], back))
+
+            # Draw the enemy, or its pieces once destroyed
             if not enemy_destroyed:
-                if current_time - last_enemy_shoot_time > enemy_shoot_cooldown:
-                    # Predict the player's future position
-                    player_future_x = player.centerx + (player_speed if keys[pygame.K_d] else -player_speed if keys[pygame.K_a] else 0)
-                    player_future_y = player.centery + (player_speed if keys[pygame.K_s] else -player_speed if keys[pygame.K_w] else 0)
-
-                    # Create a bullet aimed at the predicted position
-                    bullet_dx = player_future_x - arena_enemy.centerx
-                    bullet_dy = player_future_y - arena_enemy.centery
-                    bullet_distance = max(1, (bullet_dx**2 + bullet_dy**2)**0.5)  # Avoid division by zero
-                    bullet_velocity_x = (bullet_dx / bullet_distance) * enemy_bullet_speed
-                    bullet_velocity_y = (bullet_dy / bullet_distance) * enemy_bullet_speed
-
-                    # Add the bullet with velocity
-                    enemy_bullets.append({"rect": pygame.Rect(arena_enemy.centerx - 5, arena_enemy.bottom, 10, 20),
-                                          "velocity": (bullet_velocity_x, bullet_velocity_y)})
-
-                    last_enemy_shoot_time = current_time
-
-                # Move enemy bullets
-                for bullet in enemy_bullets[:]:
-                    bullet["rect"].x += bullet["velocity"][0]
-                    bullet["rect"].y += bullet["velocity"][1]
-                    if bullet["rect"].top > HEIGHT or bullet["rect"].bottom < 0 or bullet["rect"].left > WIDTH or bullet["rect"].right < 0:
-                        enemy_bullets.remove(bullet)  # Remove bullets that go off-screen
-                    elif bullet["rect"].colliderect(player):
-                        enemy_bullets.remove(bullet)
-                        player_health -= 1
-                        play_fx(hit_sound, channel_fx_hit, hit_sound_volume)
+                WIN.draw_rect(RED, interpolated(arena_enemy, arena_previous[1], back))  # Draw the enemy if not destroyed
             else:
-                # If enemy is destroyed, clear all enemy bullets
-                enemy_bullets.clear()
-
-            # Check for game over or victory
-            if arena_enemy_health <= 0 and not enemy_destroyed:
-                print("Enemy health is 0. Triggering destruction effect.")  # Debugging output
-
-            if enemy_destroyed:
-                print(f"Animating {len(enemy_pieces)} enemy pieces...")  # Debugging output
-
-            if arena_enemy_health <= 0 and not enemy_destroyed:
-                print("Enemy health is 0. Triggering destruction effect.")  # Debugging output
-                enemy_destroyed = True
-                enemy_destroy_start_time = pygame.time.get_ticks()  # Start the destruction timer
-
-                # Create enemy pieces
-                piece_size = 10  # Size of each piece
-                for i in range(arena_enemy.width // piece_size):
-                    for j in range(arena_enemy.height // piece_size):
-                        piece_rect = pygame.Rect(
-                            arena_enemy.x + i * piece_size,
-                            arena_enemy.y + j * piece_size,
-                            piece_size,
-                            piece_size
-                        )
-                        piece_velocity = [random.randint(-5, 5), random.randint(-5, 5)]  # Random velocity
-                        enemy_pieces.append({"rect": piece_rect, "velocity": piece_velocity})
-
-                print(f"Created {len(enemy_pieces)} enemy pieces for destruction animation.")  # Debugging output
-
-            elif player_health <= 0:
-                pygame.mixer.music.stop()  # Stop the arena music
-                play_fx(game_over_sound, channel_fx_hit, hit_sound_volume)
-                game_state = "game_over"
-
-
-            # Draw bullets (arena mode, dict structure)
-            for bullet in bullets:
-                color = (0, 255, 255) if bullet['piercing'] else BLUE
-                pygame.draw.rect(WIN, color, bullet['rect'])
-            for bullet in enemy_bullets:
-                pygame.draw.rect(WIN, RED, bullet["rect"])
-
-        else:  # Pause menu
-            pause_text = big_font.render("PAUSED", True, WHITE)
-            WIN.blit(pause_text, (WIDTH//2 - pause_text.get_width()//2, HEIGHT//2 - 50))
-            
-            # Add a "MENU" button below the pause text
-            draw_button("MENU", BUTTONS["menu_pause"], BLUE)
-
-            # Handle "MENU" button click
+                arena_particles.draw(WIN, back)  # Draw all pieces
+
+            # Draw health bars with labels
+            profiling.lap("draw")
+            WIN.draw_rect(WHITE, (50, 10, 200, 20))  # Player health bar background
+            WIN.draw_rect(GREEN, (50, 10, (player_health / player_max_health) * 200, 20))  # Player health
+            player_label = render_text(font, "Player", WHITE)
+            WIN.blit(player_label, (50, 35))  # Label above the player health bar
+
+            WIN.draw_rect(WHITE, (WIDTH - 250, 10, 200, 20))  # Enemy health bar background
+            WIN.draw_rect(GREEN, (WIDTH - 250, 10, (arena_enemy_health / arena_enemy_max_health) * 200, 20))  # Enemy health
+            enemy_label = render_text(font, "Enemy", WHITE)
+            WIN.blit(enemy_label, (WIDTH - 250, 35))  # Label above the enemy health bar
+            profiling.lap("hud")
+
+            # Draw bullets
+            for rect, piercing in zip(bullets.rects(back), bullets.column("flag").tolist()):
+                WIN.draw_rect((0, 255, 255) if piercing else BLUE, rect)
+            for rect in enemy_bullets.rects(back):
+                WIN.draw_rect(RED, rect)
+
+            if pause:  # Pause menu
+                pause_text = render_text(big_font, "PAUSED", WHITE)
+                WIN.blit(pause_text, (WIDTH//2 - pause_text.get_width()//2, HEIGHT//2 - 50))
+
+                # Add a "MENU" button below the pause text
+                draw_button("MENU", BUTTONS["menu_pause"], BLUE)
+
+                # Handle "MENU" button click
+                if event.type == pygame.MOUSEBUTTONDOWN:
+                    mx, my = mouse_pos
+                    if BUTTONS["menu_pause"].collidepoint(mx, my):
+                        play_fx(sounds["click"], channel_fx_ui, click_sound_volume)
+                        reset_game()
+                        pause = False  # Reset pause state
+                        game_state = "menu"
+
+        elif game_state == "victory":
+
+            # Ensure the global declaration is before any assignment
+            # Play victory music only once
+            if not victory_music_playing:
+                log.debug("Loading and playing victory music")
+                pygame.mixer.music.stop()  # Ensure no other music is playing
+                try:
+                    load_music("victory")
+                    pygame.mixer.music.set_volume(background_music_volume)  # Use the same volume setting
+                    pygame.mixer.music.play(-1)  # Loop the victory music
+                    victory_music_playing = True  # Set the flag to prevent repeated playback
+                    log.debug("Victory music is now playing")
+                except pygame.error as e:
+                    log.error("Error loading victory music: %s", e)
+
+            # Display "Victory" text
+            victory_text = render_text(big_font, "VICTORY!", GREEN)
+            WIN.blit(victory_text, (WIDTH//2 - victory_text.get_width()//2, HEIGHT//2 - 50))
+
+            # Add a "Menu" button
+            draw_button("MENU", BUTTONS["menu_victory"], BLUE)
+
+            # Handle button clicks
+            if event.type == pygame.MOUSEBUTTONDOWN:
+                mx, my = mouse_pos
+                if BUTTONS["menu_victory"].collidepoint(mx, my):
+                    play_fx(sounds["click"], channel_fx_ui, click_sound_volume)
+                    reset_game()  # Reset all variables
+                    pygame.mixer.music.stop()  # Stop victory music
+                    play_background_music()  # Restart background music
+                    victory_music_playing = False  # Reset the flag
+                    game_state = "menu"  # Return to the main menu
+
+
+        elif game_state == "settings":
+            # Menu background, card, title and slider labels
+            draw_card_layer("settings", render_settings_layer)
+            card_x, card_y, card_width, card_height = SETTINGS_CARD
+
+            # Adjust slider positions to fit inside the card
+            slider_x = card_x + 210
+            slider_music_rect = pygame.Rect(slider_x, card_y + 98, slider_width, slider_height)
+            slider_shoot_rect = pygame.Rect(slider_x, card_y + 158, slider_width, slider_height)
+            slider_hit_rect = pygame.Rect(slider_x, card_y + 218, slider_width, slider_height)
+
+            # Draw the sliders
+            draw_slider(slider_music_rect, background_music_volume)
+            draw_slider(slider_shoot_rect, shoot_sound_volume)
+            draw_slider(slider_hit_rect, hit_sound_volume)
+
+            # Draw the menu button at the bottom of the card
+            menu_btn_rect = pygame.Rect(WIDTH//2 - 55, card_y + card_height - 70, 110, 50)
+            draw_button("MENU", menu_btn_rect, BLUE)
+
+            # Handle slider interaction
             if event.type == pygame.MOUSEBUTTONDOWN:
-                mx, my = pygame.mouse.get_pos()
-                if BUTTONS["menu_pause"].collidepoint(mx, my):
-                    play_fx(click_sound, channel_fx_ui, click_sound_volume)
+                mx, my = mouse_pos
+                if slider_music_rect.collidepoint(mx, my):
+                    dragging_slider = "music"
+                elif slider_shoot_rect.collidepoint(mx, my):
+                    dragging_slider = "shoot"
+                elif slider_hit_rect.collidepoint(mx, my):
+                    dragging_slider = "hit"
+                elif menu_btn_rect.collidepoint(mx, my):  # Handle "MENU" button click
+                    play_fx(sounds["click"], channel_fx_ui, click_sound_volume)
+                    file_writer.flush(wait=False)  # Write pending settings now instead of after the delay
+                    game_state = "menu"
+
+            if event.type == pygame.MOUSEBUTTONUP:
+                dragging_slider = None
+
+            if event.type == pygame.MOUSEMOTION and dragging_slider:
+                mx, _ = mouse_pos
+                if dragging_slider == "music":
+                    old = background_music_volume
+                    background_music_volume = handle_slider_movement(slider_music_rect, background_music_volume, mx)
+                    pygame.mixer.music.set_volume(background_music_volume)
+                    if background_music_volume != old:
+                        save_settings()
+                elif dragging_slider == "shoot":
+                    old = shoot_sound_volume
+                    shoot_sound_volume = handle_slider_movement(slider_shoot_rect, shoot_sound_volume, mx)
+                    if shoot_sound_volume != old:
+                        save_settings()
+                elif dragging_slider == "hit":
+                    old = hit_sound_volume
+                    hit_sound_volume = handle_slider_movement(slider_hit_rect, hit_sound_volume, mx)
+                    if hit_sound_volume != old:
+                        save_settings()
+
+        elif game_state == "game_over":
+            # Display "GAME OVER" text
+            game_over_text = render_text(big_font, "GAME OVER", WHITE)
+            WIN.blit(game_over_text, (WIDTH//2 - game_over_text.get_width()//2, 100))
+
+            # Display the score reached
+            score_text = render_text(font, f"Score: {survival_state.score}", WHITE)
+            WIN.blit(score_text, (WIDTH//2 - score_text.get_width()//2, 180))
+
+            # Place the "TRY AGAIN" button
+            try_again_button = pygame.Rect(WIDTH//2 - 100, HEIGHT//2 - 40, 200, 50)  # Adjusted size and position
+            draw_button("TRY AGAIN", try_again_button, BLUE)
+
+            # Place the "MENU" button below the "TRY AGAIN" button
+            menu_button_game_over = pygame.Rect(WIDTH//2 - 100, HEIGHT//2 + 20, 200, 50)  # Adjusted position
+            draw_button("MENU", menu_button_game_over, BLUE)
+
+            # Handle button clicks
+            if event.type == pygame.MOUSEBUTTONDOWN:
+                mx, my = mouse_pos
+                if try_again_button.collidepoint(mx, my):
+                    play_fx(sounds["click"], channel_fx_ui, click_sound_volume)
+                    save_score(survival_state.score)  # Always save score before resetting
                     reset_game()
+                    play_background_music()  # Restart background music
+                    pause = False  # Reset pause state
+                    game_state = "play"
+                elif menu_button_game_over.collidepoint(mx, my):
+                    play_fx(sounds["click"], channel_fx_ui, click_sound_volume)
+                    save_score(survival_state.score)  # Always save score before resetting
+                    reset_game()
+                    play_background_music()  # Restart background music
                     pause = False  # Reset pause state
                     game_state = "menu"
 
-    elif game_state == "victory":
-
-        # Ensure the global declaration is before any assignment
-        # Play victory music only once
-        if not victory_music_playing:
-            print("Loading and playing victory music...")  # Debugging output
-            pygame.mixer.music.stop()  # Ensure no other music is playing
-            try:
-                pygame.mixer.music.load(victory_music)
-                pygame.mixer.music.set_volume(background_music_volume)  # Use the same volume setting
-                pygame.mixer.music.play(-1)  # Loop the victory music
-                victory_music_playing = True  # Set the flag to prevent repeated playback
-                print("Victory music is now playing.")  # Debugging output
-            except pygame.error as e:
-                print(f"Error loading victory music: {e}")  # Debugging output
-
-        # Display "Victory" text
-        victory_text = big_font.render("VICTORY!", True, GREEN)
-        WIN.blit(victory_text, (WIDTH//2 - victory_text.get_width()//2, HEIGHT//2 - 50))
-
-        # Add a "Menu" button
-        draw_button("MENU", BUTTONS["menu_victory"], BLUE)
-
-        # Handle button clicks
-        if event.type == pygame.MOUSEBUTTONDOWN:
-            mx, my = pygame.mouse.get_pos()
-            if BUTTONS["menu_victory"].collidepoint(mx, my):
-                play_fx(click_sound, channel_fx_ui, click_sound_volume)
-                reset_game()  # Reset all variables
-                pygame.mixer.music.stop()  # Stop victory music
-                play_background_music()  # Restart background music
-                victory_music_playing = False  # Reset the flag
-                game_state = "menu"  # Return to the main menu
-
-
-    elif game_state == "settings":
-        # Draw the menu background image (same as menu)
-        WIN.blit(menu_background, (0, 0))
-
-        # Card style matches leaderboard: larger, more padding
-        card_width, card_height = 480, 380
-        card_x = WIDTH // 2 - card_width // 2
-        card_y = HEIGHT // 2 - card_height // 2
-        shadow_offset = 10
-        # Drop shadow
-        shadow_surf = pygame.Surface((card_width, card_height), pygame.SRCALPHA)
-        pygame.draw.rect(shadow_surf, (0, 0, 0, 120), shadow_surf.get_rect(), border_radius=22)
-        WIN.blit(shadow_surf, (card_x + shadow_offset, card_y + shadow_offset))
-        # Card
-        card_surf = pygame.Surface((card_width, card_height), pygame.SRCALPHA)
-        pygame.draw.rect(card_surf, (30, 40, 60, 235), card_surf.get_rect(), border_radius=22)
-        # Draw border (2px, same as leaderboard)
-        pygame.draw.rect(card_surf, (30, 40, 60, 235), card_surf.get_rect(), width=2, border_radius=22)
-        WIN.blit(card_surf, (card_x, card_y))
-
-        # Use slightly smaller font for title and labels for best fit
-        settings_title_font = pygame.font.SysFont("arial", 38, bold=True)
-        settings_label_font = pygame.font.SysFont("arial", 24)
-
-        # Draw the title inside the card
-        title = settings_title_font.render("SETTINGS", True, (200,220,255))
-        WIN.blit(title, (WIDTH//2 - title.get_width()//2, card_y + 28))
-
-        # Add labels for each slider
-        music_label = settings_label_font.render("Music Volume", True, WHITE)
-        shoot_label = settings_label_font.render("Shoot Volume", True, WHITE)
-        hit_label = settings_label_font.render("Hit Volume", True, WHITE)
-
-        # Position the labels above the sliders (inside the card)
-        label_x = card_x + 44
-        WIN.blit(music_label, (label_x, card_y + 90))
-        WIN.blit(shoot_label, (label_x, card_y + 150))
-        WIN.blit(hit_label, (label_x, card_y + 210))
-
-        # Adjust slider positions to fit inside the card
-        slider_x = card_x + 210
-        slider_music_rect = pygame.Rect(slider_x, card_y + 98, slider_width, slider_height)
-        slider_shoot_rect = pygame.Rect(slider_x, card_y + 158, slider_width, slider_height)
-        slider_hit_rect = pygame.Rect(slider_x, card_y + 218, slider_width, slider_height)
-
-        # Draw the sliders
-        draw_slider(slider_music_rect, background_music_volume)
-        draw_slider(slider_shoot_rect, shoot_sound_volume)
-        draw_slider(slider_hit_rect, hit_sound_volume)
-
-        # Draw the menu button at the bottom of the card
-        menu_btn_rect = pygame.Rect(WIDTH//2 - 55, card_y + card_height - 70, 110, 50)
-        draw_button("MENU", menu_btn_rect, BLUE)
-
-        # Handle slider interaction
-        if event.type == pygame.MOUSEBUTTONDOWN:
-            mx, my = pygame.mouse.get_pos()
-            if slider_music_rect.collidepoint(mx, my):
-                dragging_slider = "music"
-            elif slider_shoot_rect.collidepoint(mx, my):
-                dragging_slider = "shoot"
-            elif slider_hit_rect.collidepoint(mx, my):
-                dragging_slider = "hit"
-            elif menu_btn_rect.collidepoint(mx, my):  # Handle "MENU" button click
-                play_fx(click_sound, channel_fx_ui, click_sound_volume)
-                game_state = "menu"
-
-        if event.type == pygame.MOUSEBUTTONUP:
-            dragging_slider = None
-
-        if event.type == pygame.MOUSEMOTION and dragging_slider:
-            mx, _ = pygame.mouse.get_pos()
-            if dragging_slider == "music":
-                old = background_music_volume
-                background_music_volume = handle_slider_movement(slider_music_rect, background_music_volume, mx)
-                pygame.mixer.music.set_volume(background_music_volume)
-                if background_music_volume != old:
-                    save_settings()
-            elif dragging_slider == "shoot":
-                old = shoot_sound_volume
-                shoot_sound_volume = handle_slider_movement(slider_shoot_rect, shoot_sound_volume, mx)
-                if shoot_sound_volume != old:
-                    save_settings()
-            elif dragging_slider == "hit":
-                old = hit_sound_volume
-                hit_sound_volume = handle_slider_movement(slider_hit_rect, hit_sound_volume, mx)
-                if hit_sound_volume != old:
-                    save_settings()
-
-    elif game_state == "game_over":
-        # Display "GAME OVER" text
-        game_over_text = big_font.render("GAME OVER", True, WHITE)
-        WIN.blit(game_over_text, (WIDTH//2 - game_over_text.get_width()//2, 100))
-        
-        # Display the score reached
-        score_text = font.render(f"Score: {score}", True, WHITE)
-        WIN.blit(score_text, (WIDTH//2 - score_text.get_width()//2, 180))
-        
-        # Place the "TRY AGAIN" button
-        try_again_button = pygame.Rect(WIDTH//2 - 100, HEIGHT//2 - 40, 200, 50)  # Adjusted size and position
-        draw_button("TRY AGAIN", try_again_button, BLUE)
-        
-        # Place the "MENU" button below the "TRY AGAIN" button
-        menu_button_game_over = pygame.Rect(WIDTH//2 - 100, HEIGHT//2 + 20, 200, 50)  # Adjusted position
-        draw_button("MENU", menu_button_game_over, BLUE)
-
-        # Handle button clicks
-        if event.type == pygame.MOUSEBUTTONDOWN:
-            mx, my = pygame.mouse.get_pos()
-            if try_again_button.collidepoint(mx, my):
-                play_fx(click_sound, channel_fx_ui, click_sound_volume)
-                save_score(score)  # Always save score before resetting
-                reset_game()
-                play_background_music()  # Restart background music
-                pause = False  # Reset pause state
-                game_state = "play"
-            elif menu_button_game_over.collidepoint(mx, my):
-                play_fx(click_sound, channel_fx_ui, click_sound_volume)
-                save_score(score)  # Always save score before resetting
-                reset_game()
-                play_background_music()  # Restart background music
-                pause = False  # Reset pause state
-                game_state = "menu"
-
+        profiling.lap("draw")
+
+        # Show when time does not run at normal speed
+        if game_clock.paused or game_clock.time_scale != 1:
+            time_label = render_text(font, "TIME FROZEN" if game_clock.paused else f"TIME x{game_clock.time_scale:g}", YELLOW)
+            WIN.blit(time_label, (WIDTH - time_label.get_width() - 10, HEIGHT - time_label.get_height() - 10))
+        profiling.lap("hud")
+
+        if show_profiler:
+            draw_profiler_overlay()
+            profiling.lap("overlay")
+
+        WIN.present()
+        record_frame_time(update_end - frame_start, time.perf_counter() - update_end + fill_time)
+        if profiler:
+            profiler.lap("present")
+            count_entities()
+            profiler.end(game_state)
+        if capture and capture.end_frame():
+            finish_frame_capture()
+
+def asset_loaders():
+    # Everything the loading screen loads
+    loaders = {"image/menu_background": load_menu_background}
+    for name in SOUND_FILES:
+        loaders["sound/" + name] = functools.partial(load_sound, name)
+    for name in MUSIC_FILES:
+        loaders["music/" + name] = functools.partial(read_music, name)
+    return loaders
+
+def show_loading_screen():
+    # Progress bar until every asset is loaded, closing the window quits
+    while not game_assets.ready():
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                game_assets.shutdown()
+                pygame.quit()
+                sys.exit()
+        loaded, total = game_assets.progress()
+        WIN.clear()
+        loading_text = render_text(font, "LOADING...", WHITE)
+        WIN.blit(loading_text, (WIDTH//2 - loading_text.get_width()//2, HEIGHT//2 - 50))
+        WIN.draw_rect(WHITE, (WIDTH//2 - 100, HEIGHT//2, 200, 20))  # Background of the progress bar
+        WIN.draw_rect(BLUE, (WIDTH//2 - 100, HEIGHT//2, 200 * loaded / total, 20))
+        WIN.present()
+        clock.tick(FPS)
+
+def init_audio():
+    global channel_fx_shoot, channel_fx_hit, channel_fx_ui, channel_fx_powerup
+    pygame.mixer.init()
+    channel_fx_shoot = pygame.mixer.Channel(1)
+    channel_fx_hit = pygame.mixer.Channel(2)
+    channel_fx_ui = pygame.mixer.Channel(3)
+    channel_fx_powerup = pygame.mixer.Channel(4)
+
+def main(argv=None):
+    global args, replay_player, recorder, rng, WIN, font, big_font, clock, file_writer
+    global game_clock, survival_state, display_health, arena_particles
+    args = parser.parse_args(argv)
+    logs.setup(args.log_level)
+    atexit.register(logs.shutdown)  # Write out the last messages, even on sys.exit()
+    if args.benchmark:
+        unknown = [name for name in args.benchmark if name not in BENCHMARK_SCENARIOS]
+        if unknown:
+            parser.error(f"unknown benchmark scenario(s): {', '.join(unknown)} (choose from {', '.join(BENCHMARK_SCENARIOS)})")
+    if args.benchmark is not None and args.record:
+        # Benchmark frames advance by a fractional SIM_DT, recordings store whole milliseconds
+        parser.error("--record cannot be combined with --benchmark")
+    benchmark_queue[:] = list(args.benchmark or BENCHMARK_SCENARIOS) if args.benchmark is not None else []
+
+    replay_player = replay.Player(args.replay) if args.replay else None
+    if replay_player:
+        seed = replay_player.seed
+    elif args.seed is not None:
+        seed = args.seed
+    else:
+        seed = random.randrange(2**63)
+    rng = random.Random(seed)
+    time_scale = replay_player.time_scale if replay_player else args.time_scale
+    recorder = replay.Recorder(args.record, seed, time_scale) if args.record else None
+    if recorder:
+        atexit.register(recorder.close)
+    if args.profile_csv:
+        frame_profiler.open_csv(args.profile_csv)
+        atexit.register(frame_profiler.close)
+    update_profiling()
+    if args.profile_frames:
+        start_frame_capture()
+
+    # Open the window before anything else, so it shows up right away
+    # Only what the window needs: pygame.init() would also open the audio
+    # device, which init_audio() does once the window is up
+    pygame.display.init()
+    pygame.font.init()
+    surfaces.surface_format = args.surface_format
+    WIN = screen.Screen(pygame.display.set_mode((WIDTH, HEIGHT)), mode=args.render_mode)
+    pygame.display.set_caption("Block Buster")
     pygame.display.update()
-
-pygame.mixer.quit()
-pygame.quit()
\ No newline at end of file
+    init_audio()
+    font = get_font("Arial", 28)
+    big_font = get_font("Arial", 50)
+    clock = pygame.time.Clock()
+    game_assets.preload(asset_loaders())
+    show_loading_screen()
+    file_writer = BackgroundWriter()
+    atexit.register(file_writer.flush)  # Never lose a queued score or setting on exit
+    load_settings()
+
+    game_clock = timing.GameClock(SIM_DT, MAX_STEPS_PER_FRAME, time_scale)
+    survival_state = survival.new_state(seed=rng.getrandbits(32))
+    display_health = survival_state.health
+    arena_particles = particles.ParticleSystem(RED, seed=rng.getrandbits(64))
+
+    run()
+    if frame_capture:
+        finish_frame_capture()  # Closed before the last profiled frame
+    game_assets.shutdown()
+    pygame.mixer.quit()
+    pygame.quit()
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,46 @@
+import pygame
+
+# Surface factory: every surface the game keeps and blits again is made here,
+# in the pixel format of the window. Blitting a surface of another format
+# makes SDL convert each pixel on the way, every frame; a display-format
+# surface is a straight copy or blend. Mostly transparent surfaces (text,
+# glows, outlines) can also be RLE encoded, so their blits skip the
+# transparent runs instead of blending them.
+# Surfaces blitted with special_flags must not be RLE encoded: pygame blends
+# those itself and would have to decode them on every blit.
+
+SURFACE_FORMATS = ["display", "native"]
+surface_format = "display"  # "native" keeps every surface as it was made, to measure the difference
+
+
+def display_ready():
+    # Conversion needs a window, headless code keeps the surfaces as they are
+    return surface_format == "display" and pygame.display.get_surface() is not None
+
+
+def prepare(surface, alpha=True, rle=False):
+    # surface in the display format, with per-pixel alpha if alpha
+    if not display_ready():
+        return surface
+    surface = surface.convert_alpha() if alpha else surface.convert()
+    if rle and alpha:
+        surface.set_alpha(255, pygame.RLEACCEL)
+    return surface
+
+
+def new(size, alpha=False):
+    # A blank surface to draw on, transparent if alpha, in the display format
+    return prepare(pygame.Surface(size, pygame.SRCALPHA if alpha else 0), alpha)
+
+
+def text(font, string, color, rle=True):
+    # Antialiased text, ready to blit
+    return prepare(font.render(string, True, color), rle=rle)
+
+
+def image(path, size=None, alpha=False):
+    # An image file, scaled to size if given
+    surface = pygame.image.load(path)
+    if size is not None and surface.get_size() != tuple(size):
+        surface = pygame.transform.scale(surface, size)
+    return prepare(surface, alpha)
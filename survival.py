@@ -0,0 +1,471 @@
+import os
+import random
+import sys
+import time
+from collections import namedtuple
+
+import numpy as np
+import pygame
+
+from entities import EntityStore, ProjectilePool
+from particles import ParticleSystem
+from profiling import lap
+from timing import Scheduler
+
+# Survival mode simulation: all of the game rules, none of the drawing.
+# square.py renders a SurvivalState, this module only updates it, so it runs
+# without a window (or with SDL's dummy video driver) as fast as the CPU allows.
+
+# Playfield
+WIDTH, HEIGHT = 800, 600
+
+# Player
+player_speed = 25
+sprint_speed = 35
+max_health = 5
+shield_duration = 5000  # milliseconds
+
+# Sprint
+max_energy = 100
+energy_drain_rate = 3.0  # Much faster drain for sprint
+energy_cooldown = 5000   # 5 seconds cooldown before instant refill
+
+# Bullets
+bullet_speed = 15  # Player bullet speed
+shoot_cooldown = 300  # Cooldown time in milliseconds
+max_bullets = 50
+max_volley = 3  # Most bullets one shot fires (triple gun)
+
+# Enemies
+max_enemies = 20
+enemy_spawn_cooldown = 2000  # Pause in spawning after a clear_enemies pickup
+
+# Boss
+boss_max_health = 100
+boss_attack_cooldown = 1000
+boss_entry_y = 60
+
+# Power-ups
+powerup_spawn_time = 5000
+POWERUP_TYPES = ["health", "shield", "clear_enemies", "double_gun", "triple_gun", "rapid_gun", "piercing_gun"]
+
+# Gun upgrade system
+GUN_UPGRADE_DURATION = 8000  # 8 seconds duration for upgrades
+rapid_fire_cooldown = 100  # ms, for rapid fire
+
+# Destruction effect
+survival_enemy_destroy_duration = 2000  # Duration of the destruction effect in milliseconds
+EXPLOSION_COLOR = (255, 50, 50)  # Same red as the enemies
+
+# One step of player input. Movement is per step (tuned for 60 steps per second),
+# dt only advances the timers.
+Inputs = namedtuple("Inputs", ["left", "right", "shoot", "sprint"])
+NO_INPUT = Inputs(False, False, False, False)
+
+
+class SurvivalState:
+    # Everything a Survival run needs. Times are milliseconds of game time (state.time).
+    def __init__(self, seed=None, high_score=0):
+        self.rng = random.Random(seed)
+        self.time = 0
+        self.events = []  # Things that happened during the last step (sounds, pickups)
+        self.game_over = False
+        self.timers = Scheduler()  # Spawns, cooldowns and expiries, run at the start of each step
+
+        # Player (with float position for smooth movement)
+        self.player = pygame.Rect(WIDTH//2 - 25, HEIGHT - 60, 50, 50)
+        self.player_pos_x = float(self.player.x)
+        self.player_previous = self.player.topleft  # Position before the last step, for drawing
+        self.health = max_health
+        self.energy = max_energy
+        self.energy_depleted_time = 0  # The refill is scheduled for energy_cooldown later
+        self.sprinting = False
+        self.shield = False
+        self.shield_end_time = 0  # Only the timer set for this time switches the shield off
+
+        # Entity groups, see entities.py. Bullets use flag for piercing,
+        # power-ups use kind as an index into POWERUP_TYPES.
+        self.bullets = ProjectilePool(max_bullets + max_volley)  # Room for a volley fired at the cap
+        self.last_shot_time = -shoot_cooldown
+        self.gun_upgrades = {}  # {upgrade_name: expiration_time}, each with a timer to remove it
+
+        # Enemies
+        self.enemies = EntityStore()
+        self.enemy_speed = 2  # Start slower at level 1
+        self.enemy_spawn_time = 1000
+        self.enemy_spawn_resume_time = 0
+        self.enemy_spawn_timer = self.timers.schedule(self.enemy_spawn_time, spawn_enemies, self)
+
+        # Boss
+        self.boss_active = False
+        self.boss = None
+        self.boss_previous = None
+        self.boss_health = boss_max_health
+        self.boss_attack_timer = None
+        self.boss_bullets = ProjectilePool()
+
+        # Power-ups
+        self.powerups = EntityStore()
+        self.timers.schedule(powerup_spawn_time, spawn_powerup, self)
+
+        # Pieces of destroyed enemies
+        self.particles = ParticleSystem(EXPLOSION_COLOR, seed=seed)
+
+        # Score
+        self.score = 0
+        self.level = 1
+        self.high_score = high_score
+
+
+def new_state(seed=None, high_score=0):
+    return SurvivalState(seed, high_score)
+
+
+def step(state, inputs, dt):
+    # Advance the simulation by one step of dt milliseconds
+    state.events = []
+    if state.game_over:
+        return
+    state.time += dt
+    state.timers.run(state.time)
+
+    update_player(state, inputs)
+    update_gun(state, inputs)
+    update_bullets(state)
+    update_spawns(state)
+    lap("update")
+    update_enemies(state)
+    lap("collision")
+    update_explosions(state)
+    lap("explosions")
+    if state.boss_active:
+        update_boss(state)
+    update_powerups(state)
+
+    new_level = state.score // 10 + 1
+    if new_level > state.level:
+        state.level = new_level
+        state.enemy_speed += 0.2  # Increase speed more slowly per level
+        state.enemy_spawn_time = max(400, state.enemy_spawn_time - 20)  # Decrease spawn time more slowly
+
+    if state.score > state.high_score:
+        state.high_score = state.score
+    lap("update")
+
+
+def lose_health(state, amount):
+    state.health -= amount
+    if state.health <= 0 and not state.game_over:
+        state.game_over = True
+        state.events.append("game_over")
+
+
+def update_player(state, inputs):
+    # Sprint logic: hold sprint to move faster while energy > 0
+    state.sprinting = False
+    if inputs.sprint and state.energy > 0:
+        state.sprinting = True
+        speed = sprint_speed
+        state.energy -= energy_drain_rate
+        if state.energy <= 0:
+            state.energy = 0
+            state.energy_depleted_time = state.time
+            # Energy only recharges after full depletion and cooldown (5s countdown, then instant refill)
+            state.timers.schedule(state.time + energy_cooldown, refill_energy, state)
+    else:
+        speed = player_speed
+
+    # Left and right only, smoothly interpolated toward the target
+    player = state.player
+    state.player_previous = player.topleft
+    target_x = state.player_pos_x
+    if inputs.left and player.left > 0:
+        target_x -= speed
+    if inputs.right and player.right < WIDTH:
+        target_x += speed
+    state.player_pos_x += (target_x - state.player_pos_x) * 0.4
+    player.x = int(state.player_pos_x)
+    player.y = HEIGHT - 60
+
+
+def refill_energy(state):
+    state.energy = max_energy
+
+
+def update_gun(state, inputs):
+    if not inputs.shoot:
+        return
+    upgrades = state.gun_upgrades
+    cooldown = rapid_fire_cooldown if 'rapid' in upgrades else shoot_cooldown
+    if state.time - state.last_shot_time < cooldown:
+        return
+    player = state.player
+    if 'triple' in upgrades:
+        # Wider spread for triple shot (shotgun style)
+        bullet_defs = [player.centerx - 30, player.centerx, player.centerx + 30]
+    elif 'double' in upgrades:
+        # Wider gap for double shot (shotgun style)
+        bullet_defs = [player.centerx - 22, player.centerx + 22]
+    else:
+        bullet_defs = [player.centerx]
+    for bx in bullet_defs:
+        state.bullets.add(bx, player.y, 10, 20, vy=-bullet_speed, flag='piercing' in upgrades)
+    state.events.append("shoot")
+    state.last_shot_time = state.time
+
+
+def update_bullets(state):
+    # Move bullets and drop the ones that left the screen
+    bullets = state.bullets
+    bullets.move()
+    bullets.keep(bullets.column("y") + bullets.column("h") >= 0)
+    # Limit the number of bullets
+    bullets.keep_last(max_bullets)
+
+
+def update_spawns(state):
+    # Boss fight trigger
+    if not state.boss_active and state.score >= 100:
+        state.boss_active = True
+        state.boss = pygame.Rect(WIDTH//2 - 75, -150, 150, 100)
+        state.boss_previous = state.boss.topleft
+        state.boss_health = boss_max_health
+        state.boss_bullets.clear()
+        state.boss_attack_timer = state.timers.schedule(state.time, boss_attack, state)
+        # Pause normal enemy spawns
+        state.enemies.clear()
+        state.enemy_spawn_timer.cancel()
+
+
+def spawn_enemies(state):
+    # Normal enemy spawn, every enemy_spawn_time while there is no boss
+    if state.time < state.enemy_spawn_resume_time:
+        # Wait for the clear_enemies pause to end
+        state.enemy_spawn_timer = state.timers.schedule(state.enemy_spawn_resume_time, spawn_enemies, state)
+        return
+    # Spawn only one enemy until level 20, then increase slowly
+    spawn_count = 1
+    if state.level >= 20:
+        spawn_count = 2
+    if state.level >= 40:
+        spawn_count = 3
+    for _ in range(spawn_count):
+        state.enemies.add(state.rng.randint(0, WIDTH-50), -50, 50, 50)
+    state.enemy_spawn_timer = state.timers.schedule(state.time + state.enemy_spawn_time, spawn_enemies, state)
+
+
+def move_enemies(state):
+    # Simple vertical movement only, speed increases with level.
+    # The old game loop moved every enemy in two passes per frame, keep that pace.
+    enemies = state.enemies
+    vertical_speed = state.enemy_speed + (state.level - 1) * 0.4  # Increase speed more gradually per level
+    y = enemies.column("y")
+    new_y = y + 2 * int(vertical_speed)
+    # Clamp position
+    np.minimum(new_y, HEIGHT - enemies.column("h"), out=new_y)
+    np.maximum(new_y, -50, out=new_y)
+    enemies.column("vy")[:] = new_y - y  # Keep the real step for drawing
+    y[:] = new_y
+
+
+def destroy_enemy(state, enemy):
+    # Score and explode an enemy (a Rect), the caller takes it out of state.enemies
+    state.score += 1
+    state.events.append("hit")
+    state.particles.burst(enemy.x, enemy.y, enemy.width, enemy.height, state.time, survival_enemy_destroy_duration)
+
+
+def update_enemies(state):
+    enemies = state.enemies
+    if not enemies:
+        return
+    move_enemies(state)
+    # Remove enemies that passed the bottom of the screen
+    enemies.keep(enemies.column("y") <= HEIGHT)
+
+    # Contacts with the player, and (enemy, bullet) hits grouped by enemy
+    touching = enemies.overlapping(state.player).tolist()
+    bullets_of = {}
+    if state.bullets:
+        hit_enemies, hit_bullets = state.bullets.pairs(enemies)
+        for i, j in zip(hit_enemies.tolist(), hit_bullets.tolist()):
+            bullets_of.setdefault(i, []).append(j)
+
+    # Resolve in enemy order, so each bullet is spent on the first enemy it reaches
+    piercing = state.bullets.column("flag")
+    removed = []
+    spent = set()  # Bullets used up this step
+    for i in sorted(set(touching).union(bullets_of)):
+        if i in touching:
+            removed.append(i)
+            if state.shield:
+                # The shield destroys enemies overlapping the player
+                destroy_enemy(state, enemies.rect(i))
+            elif not state.sprinting:  # Sprinting rams through enemies without damage
+                lose_health(state, 1)
+                if state.game_over:
+                    break
+            continue
+        for j in bullets_of[i]:
+            if j in spent:
+                continue
+            if not piercing[j]:  # Piercing bullets keep going
+                spent.add(j)
+            removed.append(i)
+            destroy_enemy(state, enemies.rect(i))
+            break
+
+    enemies.remove(removed)
+    if spent:
+        state.bullets.remove(list(spent))
+
+    # Limit the number of enemies
+    enemies.keep_last(max_enemies)
+
+
+def update_explosions(state):
+    # Animate all active enemy explosions
+    state.particles.update(state.time)
+
+
+def update_boss(state):
+    boss = state.boss
+    state.boss_previous = boss.topleft
+    # Move boss into view
+    if boss.y < boss_entry_y:
+        boss.y += 4
+    # Move boss bullets and drop the ones that left the screen
+    boss_bullets = state.boss_bullets
+    boss_bullets.move()
+    x = boss_bullets.column("x")
+    boss_bullets.keep((boss_bullets.column("y") <= HEIGHT) & (x >= 0) & (x + boss_bullets.column("w") <= WIDTH))
+    hits = boss_bullets.overlapping(state.player)
+    if len(hits):
+        for _ in hits:
+            if not state.shield and not state.sprinting:
+                lose_health(state, 2)
+        boss_bullets.remove(hits)
+
+    # Boss takes damage from player bullets
+    piercing = state.bullets.column("flag")
+    spent = []
+    for i in state.bullets.overlapping(boss).tolist():
+        state.boss_health -= 2 if piercing[i] else 1
+        if not piercing[i]:
+            spent.append(i)
+        state.events.append("hit")
+        if state.boss_health <= 0:
+            state.boss_active = False
+            state.boss = None
+            state.boss_bullets.clear()
+            state.boss_attack_timer.cancel()
+            # Enemies come back right away
+            state.enemy_spawn_timer = state.timers.schedule(state.time, spawn_enemies, state)
+            # Reward player
+            state.score += 20
+            break
+    state.bullets.remove(spent)
+
+
+def boss_attack(state):
+    # Fire a spread of bullets, every boss_attack_cooldown while the boss lives
+    boss = state.boss
+    for dx in [-40, -20, 0, 20, 40]:
+        state.boss_bullets.add(boss.centerx + dx - 5, boss.bottom, 10, 20, vx=dx//10, vy=8)
+    state.boss_attack_timer = state.timers.schedule(state.time + boss_attack_cooldown, boss_attack, state)
+
+
+def spawn_powerup(state):
+    powerup_type = state.rng.choice(POWERUP_TYPES)
+    state.powerups.add(state.rng.randint(0, WIDTH-50), -50, 50, 50, vy=5, kind=POWERUP_TYPES.index(powerup_type))
+    state.timers.schedule(state.time + powerup_spawn_time, spawn_powerup, state)
+
+
+def update_powerups(state):
+    powerups = state.powerups
+    if not powerups:
+        return
+    powerups.move()
+    powerups.keep(powerups.column("y") <= HEIGHT)
+    collected = powerups.overlapping(state.player)
+    if len(collected):
+        kinds = powerups.column("kind")[collected].tolist()
+        powerups.remove(collected)
+        for kind in kinds:
+            collect_powerup(state, POWERUP_TYPES[kind])
+
+
+def collect_powerup(state, powerup_type):
+    state.events.append("powerup")
+    if powerup_type == "health":
+        state.health = min(max_health, state.health + 1)  # Restore health
+        state.events.append("health_pickup")
+    elif powerup_type == "shield":
+        state.shield = True
+        state.shield_end_time = state.time + shield_duration
+        state.timers.schedule(state.shield_end_time, end_shield, state, state.shield_end_time)
+    elif powerup_type == "clear_enemies":
+        # Award points and trigger explosion for each enemy cleared
+        enemies = state.enemies
+        if enemies:
+            state.events.append("hit")  # One hit sound for the whole clear
+        state.score += len(enemies)
+        state.particles.burst(enemies.column("x"), enemies.column("y"), enemies.column("w"), enemies.column("h"),
+                              state.time, survival_enemy_destroy_duration)
+        enemies.clear()
+        state.events.append("clear_enemies")
+        state.enemy_spawn_resume_time = state.time + enemy_spawn_cooldown
+    elif powerup_type == "double_gun":
+        add_gun_upgrade(state, 'double')
+    elif powerup_type == "triple_gun":
+        add_gun_upgrade(state, 'triple')
+    elif powerup_type == "rapid_gun":
+        add_gun_upgrade(state, 'rapid')
+    elif powerup_type == "piercing_gun":
+        add_gun_upgrade(state, 'piercing')
+
+
+def end_shield(state, end_time):
+    # Picking up another shield moves shield_end_time and makes this timer a no-op
+    if state.shield_end_time == end_time:
+        state.shield = False
+
+
+def add_gun_upgrade(state, upgrade):
+    # Upgrades combine, picking one up again restarts its duration
+    expires = state.time + GUN_UPGRADE_DURATION
+    state.gun_upgrades[upgrade] = expires
+    state.timers.schedule(expires, remove_gun_upgrade, state, upgrade, expires)
+
+
+def remove_gun_upgrade(state, upgrade, expires):
+    if state.gun_upgrades.get(upgrade) == expires:
+        del state.gun_upgrades[upgrade]
+
+
+def autopilot(state):
+    # Simple bot for headless runs: chase the lowest enemy (or the boss) and keep shooting
+    enemies = state.enemies
+    if enemies:
+        target = enemies.rect(np.argmax(enemies.column("y") + enemies.column("h")))
+    elif state.boss_active:
+        target = state.boss
+    else:
+        return Inputs(False, False, True, False)
+    dx = target.centerx - state.player.centerx
+    return Inputs(dx < -10, dx > 10, True, False)
+
+
+if __name__ == "__main__":
+    # Headless run: python survival.py [frames] [seed]
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    frames = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    seed = int(sys.argv[2]) if len(sys.argv) > 2 else 1
+    state = new_state(seed)
+    start = time.perf_counter()
+    for frame in range(frames):
+        step(state, autopilot(state), 1000 / 60)
+        if state.game_over:
+            state = new_state(seed + frame + 1, state.high_score)
+    elapsed = time.perf_counter() - start
+    print(f"{frames} frames in {elapsed:.2f}s ({frames / elapsed:.0f} frames/s), high score {state.high_score}")
@@ -0,0 +1,71 @@
+import numpy as np
+import pygame
+import pytest
+
+from entities import EntityStore, ProjectilePool
+
+# EntityStore hit tests against a brute-force check of every pair with
+# Rect.colliderect, which the game used before the stores.
+
+
+def random_store(rng, n, low=-500, high=1300, max_size=120, store_type=EntityStore):
+    store = store_type()
+    for _ in range(n):
+        store.add(int(rng.integers(low, high)), int(rng.integers(low, high)),
+                  int(rng.integers(1, max_size)), int(rng.integers(1, max_size)))
+    return store
+
+
+def brute_pairs(store, other):
+    return [(i, j) for i in range(len(other)) for j in range(len(store))
+            if other.rect(i).colliderect(store.rect(j))]
+
+
+def brute_overlapping(store, rect):
+    return [j for j in range(len(store)) if rect.colliderect(store.rect(j))]
+
+
+@pytest.mark.parametrize("seed", range(5))
+@pytest.mark.parametrize("n, m", [(50, 20), (20, 50), (300, 200), (300, 1), (1, 50)])
+def test_pairs_match_brute_force(seed, n, m):
+    rng = np.random.default_rng(seed)
+    store, other = random_store(rng, n, store_type=ProjectilePool), random_store(rng, m)
+    i, j = store.pairs(other)
+    assert list(zip(i.tolist(), j.tolist())) == brute_pairs(store, other)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_overlapping_matches_brute_force(seed):
+    rng = np.random.default_rng(seed)
+    store = random_store(rng, 300)
+    for _ in range(50):
+        rect = pygame.Rect(int(rng.integers(-600, 1300)), int(rng.integers(-600, 1300)),
+                           int(rng.integers(1, 400)), int(rng.integers(1, 400)))
+        assert store.overlapping(rect).tolist() == brute_overlapping(store, rect)
+
+
+def test_negative_coordinates_and_touching_edges():
+    # Entities above and left of the playfield, and rects that only share an edge
+    store = EntityStore()
+    for x in (-150, -101, -100, -99, -1, 0, 1, 99, 100):
+        for y in (-100, -1, 0, 99):
+            store.add(x, y, 3, 3)
+    other = EntityStore()
+    for x in range(-160, 110, 7):
+        other.add(x, -3, 5, 5)
+        other.add(x, 97, 5, 5)
+    i, j = store.pairs(other)
+    assert list(zip(i.tolist(), j.tolist())) == brute_pairs(store, other)
+
+
+def test_empty_stores():
+    rng = np.random.default_rng(0)
+    empty = EntityStore()
+    full = random_store(rng, 300)
+
+    i, j = full.pairs(empty)
+    assert len(i) == len(j) == 0
+
+    i, j = empty.pairs(full)
+    assert len(i) == len(j) == 0
+    assert len(empty.overlapping(pygame.Rect(0, 0, 100, 100))) == 0
@@ -0,0 +1,104 @@
+import heapq
+
+# Game time. The game loop hands the clock each frame's real elapsed time once;
+# everything else reads the clock instead of asking pygame for the time, so all
+# code sees the same time within a frame, and time can be slowed down, sped up
+# or frozen without the game code noticing.
+
+TIME_SCALES = [1.0, 0.25, 10.0]  # Normal, slow motion, fast-forward
+
+
+class GameClock:
+    def __init__(self, step, max_steps=5, time_scale=1.0):
+        self.step = step            # Length of one simulation step in ms
+        self.max_steps = max_steps  # Steps per frame at normal speed, after a stall the rest is dropped
+        self.time_scale = time_scale
+        self.paused = False
+        self.time = 0.0             # Game time in ms, always a whole number of steps
+        self.accumulator = 0.0      # Scaled time not simulated yet, less than one step
+        self.steps = 0              # Steps due this frame
+
+    def tick(self, real_dt):
+        # Advance by one frame of real_dt ms and return the number of steps due
+        if self.paused:
+            self.steps = 0
+            return 0
+        self.accumulator += real_dt * self.time_scale
+        steps = int(self.accumulator // self.step)
+        self.accumulator -= steps * self.step
+        self.steps = min(steps, max(1, round(self.max_steps * self.time_scale)))
+        self.time += self.steps * self.step
+        return self.steps
+
+    def step_time(self, i):
+        # Game time of this frame's i-th step
+        return self.time - (self.steps - 1 - i) * self.step
+
+    @property
+    def back(self):
+        # How far (0..1 of a step) the drawn state lags behind the simulated one
+        return 1 - self.accumulator / self.step
+
+    def next_time_scale(self):
+        # Cycle through TIME_SCALES
+        i = TIME_SCALES.index(self.time_scale) if self.time_scale in TIME_SCALES else -1
+        self.time_scale = TIME_SCALES[(i + 1) % len(TIME_SCALES)]
+        return self.time_scale
+
+    def toggle_paused(self):
+        self.paused = not self.paused
+        return self.paused
+
+
+class Timer:
+    # One scheduled call, see Scheduler
+    __slots__ = ("when", "callback", "args")
+
+    def __init__(self, when, callback, args):
+        self.when = when
+        self.callback = callback
+        self.args = args
+
+    def cancel(self):
+        self.callback = None
+
+    @property
+    def pending(self):
+        return self.callback is not None
+
+
+class Scheduler:
+    # Calls to make at a given game time: cooldowns, expiries and spawns.
+    # Timers wait in a heap ordered by due time, so each poll only looks at
+    # the timers that are due and costs nothing for the ones that are not.
+    # Cancelled timers stay in the heap and are dropped when they come up.
+    def __init__(self):
+        self.heap = []
+        self.counter = 0  # Timers due at the same time fire in the order they were set
+
+    def __len__(self):
+        return len(self.heap)
+
+    def schedule(self, when, callback, *args):
+        # Call callback(*args) once the game time reaches when
+        timer = Timer(when, callback, args)
+        heapq.heappush(self.heap, (when, self.counter, timer))
+        self.counter += 1
+        return timer
+
+    def run(self, now):
+        # Fire every timer due by now, earliest first, and return how many fired.
+        # Timers set by a callback fire in the same run if they are due too.
+        heap = self.heap
+        fired = 0
+        while heap and heap[0][0] <= now:
+            timer = heapq.heappop(heap)[2]
+            callback = timer.callback
+            if callback is not None:
+                timer.callback = None
+                callback(*timer.args)
+                fired += 1
+        return fired
+
+    def clear(self):
+        self.heap = []